@@ -0,0 +1,41 @@
+import os
+import time
+import pickle
+
+SNAPSHOT_PATH = "snapshots/"
+SNAPSHOT_MAX_AGE = 15 * 60
+
+
+class AnalyzerSnapshots:
+    def __init__(self, test_mode=False, path=SNAPSHOT_PATH):
+        self.path = os.path.join(path, "test" if test_mode else "main")
+
+    def _file(self, symbol):
+        return os.path.join(self.path, symbol + ".pickle")
+
+    def save(self, symbol, analyzer_obj):
+        os.makedirs(self.path, exist_ok=True)
+        tmp_file = self._file(symbol) + ".tmp"
+        try:
+            with open(tmp_file, mode="wb") as file:
+                pickle.dump({'time': time.time(), 'analyzer': analyzer_obj}, file)
+        except (pickle.PicklingError, TypeError, AttributeError) as ex_:
+            print(f"[ERROR] from AnalyzerSnapshots.save: {symbol} snapshot not saved: {ex_}")
+            return
+        os.replace(tmp_file, self._file(symbol))
+
+    def age(self, symbol):
+        if not os.path.exists(self._file(symbol)):
+            return None
+        return time.time() - os.path.getmtime(self._file(symbol))
+
+    def load(self, symbol, max_age=SNAPSHOT_MAX_AGE):
+        age = self.age(symbol)
+        if age is None or age > max_age:
+            return None
+        try:
+            with open(self._file(symbol), mode="rb") as file:
+                return pickle.load(file)['analyzer']
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as ex_:
+            print(f"[ERROR] from AnalyzerSnapshots.load: {symbol} snapshot unreadable: {ex_}")
+            return None
@@ -0,0 +1,181 @@
+import os
+import re
+import csv
+import time
+from concurrent.futures import as_completed
+
+import numpy as np
+from source.dataset_builder import DatasetBuilder
+from source.signals import signal_strength, signal_position
+from source.signals import CONFIRMED_STRENGTH, CONFIRMED_PREDICTION, LITTLE_CONFIRMED_STRENGTH
+from source.training_driver import create_pool, THREADS_PER_WORKER
+from config import SYMBOLS
+
+WINDOW = 60
+STEP = 5
+EPOCHS = 1500
+FINE_TUNE_EPOCHS = 150
+
+# datafile keys count days, see sample_store.datafile_key
+HORIZON_UNITS = {'H': 1 / 24, 'D': 1, 'W': 7, 'M': 30, 'Y': 365}
+
+BACKTEST_REPORT_PATH = "backtest_reports.csv"
+REPORT_FIELDS = ['ticker', 'time_frame', 'model_struct', 'window', 'step', 'windows', 'predictions', 'hit_rate',
+                 'confirmed_trades', 'confirmed_pnl', 'little_confirmed_trades', 'little_confirmed_pnl',
+                 'window_time', 'total_time']
+
+
+def horizon_days(time_frame):
+    # "Difference_1D" -> 1, "Difference_1W" -> 7
+    match = re.search(r"(\d+)([HDWMY])$", time_frame)
+    if match is None:
+        raise ValueError(f"can't read the horizon of time frame {time_frame}")
+    return int(match.group(1)) * HORIZON_UNITS[match.group(2)]
+
+
+class WalkForwardBacktest:
+    def __init__(self, ticker, time_frame, mode='full', model_struct=3, window=WINDOW, step=STEP, epochs=EPOCHS,
+                 fine_tune_epochs=FINE_TUNE_EPOCHS, test_mode=False, dataset=None):
+        self.ticker = ticker
+        self.time_frame = time_frame
+        self.mode = mode
+        self.model_struct = model_struct
+        self.window = window
+        self.step = step
+        self.epochs = epochs
+        self.fine_tune_epochs = fine_tune_epochs
+        self.test_mode = test_mode
+
+        if dataset is None:
+            dataset = DatasetBuilder(test_mode=test_mode).build(ticker)
+        self.dataset = dataset
+
+        self.predictions = None
+        self.actual = None
+        self.strength = None
+        self.window_times = []
+
+    def run(self):
+        from source.neural_network import NeuralNetwork
+
+        x, y, keys = self.dataset.rows(self.time_frame, self.mode)
+        horizon = horizon_days(self.time_frame)
+        conclusions = self.dataset.conclusions(self.time_frame)
+        if len(x) <= self.window:
+            raise ValueError(f"{self.ticker} has {len(x)} samples, not enough for a {self.window} samples window")
+
+        network = NeuralNetwork(ticker=self.ticker, mode=self.mode, model_struct=self.model_struct,
+                                time_frame=self.time_frame, limitation_ps=1, limitation_pr=self.window,
+                                test_mode=self.test_mode, dataset=self.dataset)
+
+        predictions = []
+        tested = []
+        self.window_times = []
+        trained_until = 0
+
+        for end in range(self.window, len(x), self.step):
+            time_start = time.perf_counter()
+
+            # a row's result is only known one horizon after its key, so rows still open when
+            # x[end] is predicted stay out of training
+            train_end = min(end, int(np.searchsorted(keys, keys[end] - horizon, side='right')))
+            if train_end == 0:
+                continue
+
+            if trained_until == 0:
+                train_start = max(0, train_end - self.window)
+                network.model.fit(x[train_start:train_end], y[train_start:train_end], epochs=self.epochs, verbose=0)
+            elif train_end > trained_until:
+                # the weights carry over from the previous window, only the rows that slid in are new
+                network.model.fit(x[trained_until:train_end], y[trained_until:train_end],
+                                  epochs=self.fine_tune_epochs, verbose=0)
+            trained_until = max(trained_until, train_end)
+
+            predictions.append(network.predict_batch(x[end:end + self.step]))
+            tested.append(np.arange(end, min(end + self.step, len(x))))
+            self.window_times.append(time.perf_counter() - time_start)
+
+        if not predictions:
+            raise ValueError(f"{self.ticker} has no {self.time_frame} results old enough to train on")
+
+        self.predictions = np.concatenate(predictions)
+        tested = np.concatenate(tested)
+        self.actual = y[tested]
+        self.strength = signal_strength(self.predictions['total'], {field: values[tested]
+                                                                     for field, values in conclusions.items()})
+        return self.report()
+
+    def report(self):
+        total = self.predictions['total']
+        actual = self.actual[:, 0]
+
+        result = {
+            'ticker': self.ticker,
+            'time_frame': self.time_frame,
+            'model_struct': self.model_struct,
+            'window': self.window,
+            'step': self.step,
+            'windows': len(self.window_times),
+            'predictions': len(total),
+            'hit_rate': float(np.mean(np.sign(total) == np.sign(actual))),
+            'window_time': float(np.mean(self.window_times)),
+            'total_time': float(np.sum(self.window_times))
+        }
+
+        for name, min_strength, min_prediction in [('confirmed', CONFIRMED_STRENGTH, CONFIRMED_PREDICTION),
+                                                   ('little_confirmed', LITTLE_CONFIRMED_STRENGTH, 0)]:
+            position = signal_position(self.strength, total, min_strength=min_strength, min_prediction=min_prediction)
+            result[f"{name}_trades"] = int(np.count_nonzero(position))
+            result[f"{name}_pnl"] = float(np.sum(position * actual))
+
+        return result
+
+
+def backtest_symbol(symbol, time_frame, test_mode=False, **backtest_kwargs):
+    return WalkForwardBacktest(symbol.replace("USDT", ""), time_frame, test_mode=test_mode, **backtest_kwargs).run()
+
+
+def write_backtest_report(results, path=BACKTEST_REPORT_PATH):
+    new_file = not os.path.exists(path)
+    with open(path, mode="a", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=REPORT_FIELDS)
+        if new_file:
+            writer.writeheader()
+        writer.writerows(results)
+
+
+def backtest_all(time_frame, symbols=SYMBOLS, test_mode=False, workers=None, threads=THREADS_PER_WORKER,
+                 **backtest_kwargs):
+    builder = DatasetBuilder(test_mode=test_mode)
+    tickers = builder.store.tickers()
+
+    # symbols without stored samples would only fail inside the workers
+    skipped = [symbol for symbol in symbols if symbol.replace("USDT", "") not in tickers]
+    if skipped:
+        print(f"[INFO] from backtest: no samples for {', '.join(skipped)}, skipped")
+    symbols = [symbol for symbol in symbols if symbol not in skipped]
+
+    for symbol in symbols:
+        builder.build(symbol.replace("USDT", ""))
+
+    results = []
+    with create_pool(workers, threads) as pool:
+        futures = {pool.submit(backtest_symbol, symbol, time_frame, test_mode=test_mode, **backtest_kwargs): symbol
+                   for symbol in symbols}
+
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception as ex_:
+                print(f"[ERROR] from backtest: {futures[future]} failed: {ex_}")
+                continue
+            print(f"[INFO] from backtest: {futures[future]} hit rate {results[-1]['hit_rate']:.2f}, "
+                  f"confirmed pnl {results[-1]['confirmed_pnl'] * 100:.2f} %, "
+                  f"{results[-1]['window_time']:.2f} s per window")
+
+    write_backtest_report(results)
+    return results
+
+
+if __name__ == '__main__':
+    backtest_all('Difference_1D')
@@ -1,35 +1,48 @@
 import time
+import argparse
 
 from source.scraper import Scraper
 from source.analyzer import Analyzer
 from source.analyzer import get_date_time
+from source.run_context import get_context
+from source.report_log import prediction_log, deal_log
+from source.exchange_info import ExchangeMetadataCache
+from source.order_builder import OrderBuilder
+from source.price_feed import start_price_feed
+from source.analyzer_snapshots import AnalyzerSnapshots, SNAPSHOT_MAX_AGE
+from source.collector_daemon import daemon_analysis
+from source.numpy_inference import latest_prediction
 
 from binance.client import Client
 from binance.enums import *
 from config import api_key, secret_key
 
-import numpy as np
 from config import current_symbol
 
+PROTECTION_RETRIES = 3
+PROTECTION_RETRY_DELAY = 1
+ANN_TIME_FRAME = 'Difference_1D'
 
-class Bot:
-    def __init__(self, symbol, test_mode):
-        self.client = Client(api_key, secret_key)
-
-        self.test_mode = test_mode
-        self.symbol = symbol
 
-        self.scraper_obj = Scraper(symbol=symbol, print_opt=False, test_mode=test_mode)
+def rejected(result):
+    return 'orderId' not in result
 
-        self.scraper_obj.parse_common()
-        self.scraper_obj.parse_coin_data()
 
-        print("[INFO] from Bot.__init__: scraping finished")
+class Bot:
+    def __init__(self, symbol, test_mode, context=None, client=None, exchange_info=None, scraper_obj=None,
+                 analyzer_obj=None, snapshot_max_age=SNAPSHOT_MAX_AGE):
+        self.test_mode = test_mode
+        self.symbol = symbol
+        self.context = context if context is not None else get_context(test_mode)
 
-        self.analyzer_obj = Analyzer(self.scraper_obj.info, test_mode=self.test_mode)
-        self.analyzer_obj.analyse()
+        # everything below is built on first use, so quick commands skip the scrape
+        self._client = client
+        self._exchange_info = exchange_info
+        self._scraper_obj = scraper_obj
+        self._analyzer_obj = analyzer_obj
 
-        print("[INFO] from Bot.__init__: analyse finished")
+        self.snapshots = AnalyzerSnapshots(test_mode=test_mode)
+        self.snapshot_max_age = snapshot_max_age
 
         self.deal = 0.0
 
@@ -45,12 +58,64 @@ class Bot:
 
         self.ann_coefficient = 3000
 
-    @staticmethod
-    def get_last_ann_signal():
-        with open("prediction_reports.txt", mode="r") as file:
-            result = file.read()
-            result = result.split('\n')[-2]
-            return float(result.split(';')[0])
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = Client(api_key, secret_key)
+        return self._client
+
+    @property
+    def exchange_info(self):
+        if self._exchange_info is None:
+            self._exchange_info = ExchangeMetadataCache(self.client)
+        return self._exchange_info
+
+    @property
+    def scraper_obj(self):
+        if self._scraper_obj is None:
+            self._scraper_obj = Scraper(symbol=self.symbol, print_opt=False, test_mode=self.test_mode)
+
+            self._scraper_obj.parse_common()
+            self._scraper_obj.parse_coin_data()
+            self.context.set_price(self.symbol, self._scraper_obj.info.course)
+
+            print("[INFO] from Bot.scraper_obj: scraping finished")
+        return self._scraper_obj
+
+    @property
+    def analyzer_obj(self):
+        if self._analyzer_obj is None:
+            self._analyzer_obj = daemon_analysis(self.symbol, self.snapshot_max_age)
+            if self._analyzer_obj is not None:
+                print("[INFO] from Bot.analyzer_obj: analysis received from the collector daemon")
+                return self._analyzer_obj
+
+            self._analyzer_obj = self.snapshots.load(self.symbol, self.snapshot_max_age)
+            if self._analyzer_obj is not None:
+                print(f"[INFO] from Bot.analyzer_obj: snapshot loaded ({self.snapshots.age(self.symbol):.0f} s old)")
+            else:
+                self._analyzer_obj = Analyzer(self.scraper_obj.info, test_mode=self.test_mode)
+                self._analyzer_obj.analyse()
+                self.snapshots.save(self.symbol, self._analyzer_obj)
+
+                print("[INFO] from Bot.analyzer_obj: analyse finished")
+        return self._analyzer_obj
+
+    def get_last_ann_signal(self):
+        # the exported weights predict on the current input without loading keras
+        try:
+            prediction = latest_prediction(self.symbol.replace("USDT", ""), ANN_TIME_FRAME,
+                                           store=self.context.sample_store())
+            return float(prediction[0])
+        except (FileNotFoundError, KeyError) as ex_:
+            print(f"[INFO] from Bot.get_last_ann_signal: no live prediction for {self.symbol} ({ex_}), "
+                  f"using the reported one")
+
+        record = prediction_log().latest(self.symbol, ANN_TIME_FRAME)
+        if record is None:
+            print(f"[INFO] from Bot.get_last_ann_signal: no prediction reported for {self.symbol}")
+            return 0.0
+        return record['prediction']
 
     def prepare_deal(self):
 
@@ -62,6 +127,17 @@ class Bot:
         self.deal += pow(self.analyzer_obj.info.high_24h, 3) * 1000 * self.high_24h_coefficient
         self.deal += self.get_last_ann_signal() * self.ann_coefficient
 
+    def dry_run(self):
+        time_start = time.perf_counter()
+        self.prepare_deal()
+        latency = time.perf_counter() - time_start
+
+        print(f"[INFO] from Bot.dry_run: deal {self.deal} decided in {latency * 1000:.0f} ms")
+        return self.deal, latency
+
+    def current_price(self):
+        return self.context.price(self.symbol)
+
     def get_account(self):
         info = self.client.get_account()
         balance = info["balances"]
@@ -74,115 +150,91 @@ class Bot:
             return
         elif self.deal > 0:
             side = SIDE_BUY
-            close_side = SIDE_SELL
         else:
             side = SIDE_SELL
-            close_side = SIDE_BUY
-
-        exchange_info = self.client.futures_exchange_info()
-        precision = 1
-
-        for i in exchange_info['symbols']:
-            if i['symbol'] == self.symbol:
-                precision = i['quantityPrecision']
-                break
 
         usd_quantity = 15
-        quantity = np.round(usd_quantity / self.scraper_obj.info.course, precision)
+        course = self.current_price()
 
-        if quantity == 0:
-            quantity = 1 / pow(10, precision)
+        order = OrderBuilder(self.exchange_info.get(self.symbol)).bracket(self.symbol, side, course, usd_quantity,
+                                                                          self.stop, self.target)
 
-        if side == SIDE_BUY:
-            stop_price = np.round(self.scraper_obj.info.course * (1 - self.stop), precision)
-            target_price = np.round(self.scraper_obj.info.course * (1 + self.target), precision)
-        else:
-            stop_price = np.round(self.scraper_obj.info.course * (1 + self.stop), precision)
-            target_price = np.round(self.scraper_obj.info.course * (1 - self.target), precision)
-
-        info = f"{self.symbol};{quantity};{stop_price};{target_price};{get_date_time()}\n"
-        print(info)
+        print(f"{self.symbol};{order.quantity};{order.stop_price};{order.target_price};{get_date_time()}")
 
         print(f"side: {side}")
         print(f"deal: {self.deal}")
-        print(f"quantity: {quantity}")
-        print(f"stop price: {stop_price}")
-        print(f"target price: {target_price}")
-
-        with open("deal_reports.txt", mode="a") as file:
-            file.write(info)
-
-        # main order to come in deal
-        self.client.futures_create_order(
-            symbol=self.symbol,
-            side=side,
-            type=ORDER_TYPE_MARKET,
-            quantity=quantity,
-        )
-
+        print(f"quantity: {order.quantity}")
+        print(f"stop price: {order.stop_price}")
+        print(f"target price: {order.target_price}")
+
+        deal_log().append(symbol=self.symbol, side=side, quantity=float(order.quantity),
+                          stop_price=float(order.stop_price), target_price=float(order.target_price), price=course)
+
+        # the batch endpoint runs its orders concurrently, so the reduce-only legs wait for the entry
+        try:
+            self.client.futures_create_order(**order.entry_order())
+        except Exception as ex_:
+            print(f"\nTHE MAIN ORDER REJECTED: {ex_}\n")
+            return
         print("\nTHE MAIN ORDER CREATED\n")
-        time.sleep(2)
-        precision_st = precision
-        precision_tp = precision
-
-        while True:
-            try:
-
-                # stop loss order
-                self.client.futures_create_order(
-                    symbol=self.symbol,
-                    side=close_side,
-                    type=FUTURE_ORDER_TYPE_STOP_MARKET,
-                    quantity=quantity,
-                    stopPrice=stop_price
-                )
-                break
-
-
-            except Exception as ex_:
 
-                print(ex_)
-
-                if precision_st < 1:
+        placed, failed = self.place_protection(order)
+        if failed is not None:
+            print(f"\n{failed} REJECTED, CLOSING THE POSITION\n")
+            self.close_position(order, placed)
+
+    def place_protection(self, order):
+        # the stop loss and take profit orders in one request, each rejected leg retried on its own
+        legs = order.protective_orders()
+        try:
+            results = self.client.futures_place_batch_order(batchOrders=legs)
+        except Exception as ex_:
+            # nothing is known about the legs, so each one goes through the single order retries
+            print(f"[ERROR] from Bot.place_protection: batch order failed: {ex_}")
+            results = [{'code': getattr(ex_, 'code', None), 'msg': str(ex_)} for _ in legs]
+
+        placed = []
+        for name, params, result in zip(["THE STOP LOSS ORDER", "THE CLOSE ORDER"], legs, results):
+            for _ in range(PROTECTION_RETRIES):
+                if not rejected(result):
                     break
-                precision_st -= 1
-                if side == SIDE_BUY:
-                    stop_price = np.round(self.scraper_obj.info.course * (1 - self.stop), precision_st)
-                else:
-                    stop_price = np.round(self.scraper_obj.info.course * (1 + self.stop), precision_st)
-
-        print("\nTHE STOP LOSS ORDER CREATED\n")
-        time.sleep(2)
-
-        while True:
+                print(f"\n{name} REJECTED: {result.get('msg')}, retrying\n")
+                time.sleep(PROTECTION_RETRY_DELAY)
+                try:
+                    result = self.client.futures_create_order(**params)
+                except Exception as ex_:
+                    result = {'code': getattr(ex_, 'code', None), 'msg': str(ex_)}
+
+            if rejected(result):
+                return placed, name
+            print(f"\n{name} CREATED\n")
+            placed.append(result)
+        return placed, None
+
+    def close_position(self, order, placed):
+        for result in placed:
             try:
-                # take profit order
-                self.client.futures_create_order(
-                    symbol=self.symbol,
-                    side=close_side,
-                    type=FUTURE_ORDER_TYPE_LIMIT,
-                    timeInForce=TIME_IN_FORCE_GTC,
-                    quantity=quantity,
-                    price=target_price
-                )
-                break
-
+                self.client.futures_cancel_order(symbol=self.symbol, orderId=result['orderId'])
             except Exception as ex_:
+                print(f"[ERROR] from Bot.close_position: order {result['orderId']} not canceled: {ex_}")
+        try:
+            self.client.futures_create_order(**order.close_order())
+        except Exception as ex_:
+            print(f"[ERROR] from Bot.close_position: {self.symbol} POSITION LEFT OPEN WITHOUT PROTECTION: {ex_}")
+            return
+        print("\nTHE POSITION CLOSED\n")
 
-                print(ex_)
-
-                if precision_tp < 1:
-                    break
-                precision_tp -= 1
-
-                if side == SIDE_BUY:
-                    target_price = np.round(self.scraper_obj.info.course * (1 + self.target), precision_tp)
-                else:
-                    target_price = np.round(self.scraper_obj.info.course * (1 - self.target), precision_tp)
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true", help="report the decision and its latency only")
+    args = parser.parse_args()
 
-        print("\nTHE CLOSE ORDER CREATED\n")
+    bot_obj = Bot(current_symbol, True)
 
-bot_obj = Bot(current_symbol, True)
-bot_obj.prepare_deal()
+    if args.dry_run:
+        bot_obj.dry_run()
+    else:
+        start_price_feed([current_symbol], bot_obj.context)
+        bot_obj.prepare_deal()
 
-print(bot_obj.deal)
+        print(bot_obj.deal)
@@ -0,0 +1,125 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+from source.scraper import Scraper
+from source.run_context import get_context
+from source.exchange_info import ExchangeMetadataCache
+from source.analyzer_snapshots import AnalyzerSnapshots
+from source.collection_pipeline import analyse_info, scrape_symbol
+
+from binance.client import Client
+from config import api_key, secret_key
+from config import SYMBOLS
+
+from source.bot import Bot
+
+SCRAPE_WORKERS = 8
+ANALYSIS_WORKERS = os.cpu_count() or 1
+
+CANDLE = 60 * 60
+DEAL_COOLDOWN = 4 * 60 * 60
+
+
+class BotScheduler:
+    def __init__(self, symbols=SYMBOLS, test_mode=True, trade=False, cooldown=DEAL_COOLDOWN,
+                 scrape_workers=SCRAPE_WORKERS, analysis_workers=ANALYSIS_WORKERS):
+        self.symbols = list(symbols)
+        self.test_mode = test_mode
+        self.trade = trade
+        self.cooldown = cooldown
+
+        self.client = Client(api_key, secret_key)
+        self.exchange_info = ExchangeMetadataCache(self.client)
+        self.context = get_context(test_mode)
+        self.common_scraper = Scraper(print_opt=False, test_mode=test_mode)
+        self.snapshots = AnalyzerSnapshots(test_mode=test_mode)
+
+        self.io_pool = ThreadPoolExecutor(max_workers=scrape_workers)
+        self.cpu_pool = ProcessPoolExecutor(max_workers=analysis_workers)
+
+        self.last_deal = {}
+        self.decisions = {}
+
+    def in_cooldown(self, symbol):
+        return time.time() - self.last_deal.get(symbol, 0) < self.cooldown
+
+    def scrape_symbol(self, symbol):
+        return scrape_symbol(self.common_scraper, symbol)
+
+    def run_cycle(self):
+        cycle_start = time.perf_counter()
+        self.common_scraper.parse_common()
+
+        symbols = [symbol for symbol in self.symbols if not self.in_cooldown(symbol)]
+        skipped = len(self.symbols) - len(symbols)
+        if skipped:
+            print(f"[INFO] from BotScheduler.run_cycle: {skipped} symbols in cooldown")
+
+        scrapes = {self.io_pool.submit(self.scrape_symbol, symbol): symbol for symbol in symbols}
+        analyses = {}
+        for future in as_completed(scrapes):
+            symbol = scrapes[future]
+            try:
+                scraper_obj = future.result()
+            except Exception as ex_:
+                print(f"[ERROR] from BotScheduler.run_cycle: scraping {symbol} failed: {ex_}")
+                continue
+            self.context.set_price(symbol, scraper_obj.info.course)
+            analyses[self.cpu_pool.submit(analyse_info, scraper_obj.info, self.test_mode)] = (symbol, scraper_obj)
+
+        self.decisions = {}
+        for future in as_completed(analyses):
+            symbol, scraper_obj = analyses[future]
+            try:
+                analyzer_obj = future.result()
+            except Exception as ex_:
+                print(f"[ERROR] from BotScheduler.run_cycle: analysing {symbol} failed: {ex_}")
+                continue
+            self.snapshots.save(symbol, analyzer_obj)
+
+            bot_obj = Bot(symbol, self.test_mode, context=self.context, client=self.client,
+                          exchange_info=self.exchange_info, scraper_obj=scraper_obj, analyzer_obj=analyzer_obj)
+            try:
+                bot_obj.prepare_deal()
+            except Exception as ex_:
+                print(f"[ERROR] from BotScheduler.run_cycle: preparing the deal for {symbol} failed: {ex_}")
+                continue
+            self.decisions[symbol] = bot_obj.deal
+
+            if self.trade and bot_obj.deal != 0:
+                # set first, a deal that failed halfway may still have opened a position
+                self.last_deal[symbol] = time.time()
+                try:
+                    bot_obj.come_in_deal()
+                except Exception as ex_:
+                    print(f"[ERROR] from BotScheduler.run_cycle: the deal for {symbol} failed: {ex_}")
+
+        print(f"[INFO] from BotScheduler.run_cycle: {len(self.decisions)} symbols evaluated in "
+              f"{time.perf_counter() - cycle_start:.1f} s")
+        return self.decisions
+
+    def run(self, cycles=None, candle=CANDLE):
+        done = 0
+        while cycles is None or done < cycles:
+            try:
+                self.run_cycle()
+            except Exception as ex_:
+                print(f"[ERROR] from BotScheduler.run: cycle failed: {ex_}")
+            done += 1
+            if cycles is None or done < cycles:
+                # start the next sweep at the next candle open
+                time.sleep(candle - time.time() % candle)
+
+    def close(self):
+        self.io_pool.shutdown()
+        self.cpu_pool.shutdown()
+
+
+if __name__ == '__main__':
+    scheduler = BotScheduler(test_mode=True)
+    try:
+        for deal_symbol, deal in scheduler.run_cycle().items():
+            print(f"{deal_symbol}: {deal}")
+    finally:
+        scheduler.close()
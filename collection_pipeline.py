@@ -0,0 +1,142 @@
+import os
+import copy
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from source.scraper import Scraper
+from source.analyzer import Analyzer
+from source.analyzer_snapshots import AnalyzerSnapshots
+from config import SYMBOLS
+
+SCRAPE_WORKERS = 8
+ANALYSIS_WORKERS = os.cpu_count() or 1
+QUEUE_SIZE = 16
+BATCH_SIZE = 8
+
+
+def analyse_info(info, test_mode):
+    analyzer_obj = Analyzer(info, test_mode=test_mode)
+    analyzer_obj.analyse()
+    return analyzer_obj
+
+
+def scrape_symbol(common_scraper, symbol):
+    # every symbol starts from the common data scraped once for the run
+    scraper_obj = copy.copy(common_scraper)
+    scraper_obj.info = copy.deepcopy(common_scraper.info)
+    scraper_obj.set_symbol(symbol)
+    scraper_obj.parse_coin_data()
+    return scraper_obj
+
+
+class CollectionPipeline:
+    def __init__(self, symbols=SYMBOLS, test_mode=True, scrape_workers=SCRAPE_WORKERS,
+                 analysis_workers=ANALYSIS_WORKERS, queue_size=QUEUE_SIZE, batch_size=BATCH_SIZE, common_scraper=None):
+        self.symbols = list(symbols)
+        self.test_mode = test_mode
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.analysis_workers = analysis_workers
+
+        self.common_scraper = common_scraper if common_scraper is not None else Scraper(print_opt=False,
+                                                                                        test_mode=test_mode)
+        self.snapshots = AnalyzerSnapshots(test_mode=test_mode)
+
+        self.io_pool = ThreadPoolExecutor(max_workers=scrape_workers)
+        self.cpu_pool = ProcessPoolExecutor(max_workers=analysis_workers)
+        self._pool_lock = threading.Lock()
+
+        # symbol -> (write time, analyzer_obj) of the freshest analysis
+        self.latest = {}
+
+    def _scrape(self, symbol, scraped):
+        try:
+            info = scrape_symbol(self.common_scraper, symbol).info
+        except Exception as ex_:
+            print(f"[ERROR] from CollectionPipeline: scraping {symbol} failed: {ex_}")
+            info = None
+        # blocks while the analysis stage is behind, so scraped infos never pile up
+        scraped.put((symbol, info))
+
+    def _renew_pool(self, pool):
+        # a crashed worker breaks the whole pool, every later submit would fail without a new one
+        with self._pool_lock:
+            if self.cpu_pool is pool:
+                print("[INFO] from CollectionPipeline: analysis pool broken, starting a new one")
+                pool.shutdown(wait=False)
+                self.cpu_pool = ProcessPoolExecutor(max_workers=self.analysis_workers)
+
+    def _dispatch(self, scraped, analysed):
+        # the sentinel goes out whatever happens here, run() waits for it
+        try:
+            for _ in self.symbols:
+                symbol, info = scraped.get()
+                if info is None:
+                    continue
+
+                pool = self.cpu_pool
+                try:
+                    analysed.put((symbol, pool, pool.submit(analyse_info, info, self.test_mode)))
+                except Exception as ex_:
+                    print(f"[ERROR] from CollectionPipeline: analysing {symbol} not started: {ex_}")
+                    if isinstance(ex_, BrokenProcessPool):
+                        self._renew_pool(pool)
+        finally:
+            analysed.put(None)
+
+    def _write(self, batch):
+        for symbol, analyzer_obj in batch:
+            analyzer_obj.serialize()
+            self.snapshots.save(symbol, analyzer_obj)
+            self.latest[symbol] = (time.time(), analyzer_obj)
+        print(f"[INFO] from CollectionPipeline: {len(batch)} symbols written")
+
+    def run(self):
+        run_start = time.perf_counter()
+        self.common_scraper.parse_common()
+
+        scraped = queue.Queue(maxsize=self.queue_size)
+        analysed = queue.Queue()
+
+        for symbol in self.symbols:
+            self.io_pool.submit(self._scrape, symbol, scraped)
+        dispatcher = threading.Thread(target=self._dispatch, args=(scraped, analysed), name="CollectionDispatcher",
+                                      daemon=True)
+        dispatcher.start()
+
+        # the only writer: analyses are serialized here in batches, in the order they were dispatched
+        written = []
+        batch = []
+        while True:
+            item = analysed.get()
+            if item is None:
+                break
+            symbol, pool, future = item
+            try:
+                batch.append((symbol, future.result()))
+            except Exception as ex_:
+                print(f"[ERROR] from CollectionPipeline: analysing {symbol} failed: {ex_}")
+                if isinstance(ex_, BrokenProcessPool):
+                    self._renew_pool(pool)
+                continue
+
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                written.extend(symbol for symbol, _ in batch)
+                batch = []
+
+        if batch:
+            self._write(batch)
+            written.extend(symbol for symbol, _ in batch)
+        dispatcher.join()
+
+        print(f"[INFO] from CollectionPipeline: {len(written)} of {len(self.symbols)} symbols collected in "
+              f"{time.perf_counter() - run_start:.1f} s")
+        return written
+
+    def close(self):
+        self.io_pool.shutdown()
+        self.cpu_pool.shutdown()
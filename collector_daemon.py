@@ -0,0 +1,223 @@
+import os
+import time
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+
+from source.scraper import Scraper
+from source.sample_store import SampleStore
+from source.collection_pipeline import CollectionPipeline
+from source.datafile_updater import DatafileUpdater
+from source.analyzer_snapshots import SNAPSHOT_MAX_AGE
+import config
+from config import SYMBOLS
+
+COLLECTOR_ADDRESS = ("127.0.0.1", 6010)
+
+COLLECT_PERIOD = 60 * 60
+UPDATE_PERIOD = 24 * 60 * 60
+# the update runs after the collection of the same candle has started
+UPDATE_OFFSET = 5 * 60
+
+
+def collector_authkey():
+    # connections unpickle what they receive, so there is no default key: it must come from the environment or config
+    key = os.environ.get("COLLECTOR_AUTHKEY") or getattr(config, "collector_authkey", None)
+    if isinstance(key, str):
+        key = key.encode()
+    return key or None
+
+
+def require_authkey(authkey):
+    authkey = authkey if authkey is not None else collector_authkey()
+    if not authkey:
+        raise ValueError("no collector key, set COLLECTOR_AUTHKEY or config.collector_authkey")
+    return authkey
+
+
+def next_run(period, offset=0, now=None):
+    now = time.time() if now is None else now
+    return now - (now - offset) % period + period
+
+
+class CollectorDaemon:
+    def __init__(self, symbols=SYMBOLS, test_mode=False, address=COLLECTOR_ADDRESS, authkey=None,
+                 collect_period=COLLECT_PERIOD, update_period=UPDATE_PERIOD, update_offset=UPDATE_OFFSET):
+        self.test_mode = test_mode
+        self.address = address
+        self.authkey = require_authkey(authkey)
+
+        # one scraper session and one pair of pools for the daemon's whole life
+        self.scraper_obj = Scraper(print_opt=False, test_mode=test_mode)
+        self.store = SampleStore(test_mode=test_mode)
+        self.pipeline = CollectionPipeline(symbols, test_mode=test_mode, common_scraper=self.scraper_obj)
+        self.updater = DatafileUpdater(test_mode=test_mode, store=self.store, scraper_obj=self.scraper_obj)
+
+        self.jobs = {
+            'collect': (self.collect, collect_period, 0),
+            'update': (self.update, update_period, update_offset)
+        }
+        self.last_run = {}
+        # a job stays due until it ran, so one that came due during another job's run is not skipped
+        self.next_due = {name: next_run(period, offset) for name, (_, period, offset) in self.jobs.items()}
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._listener = None
+
+    def collect(self):
+        self.pipeline.run()
+        self.store.rebuild()
+
+    def update(self):
+        if self.updater.run():
+            self.store.rebuild()
+
+    def run_job(self, name):
+        job, _, _ = self.jobs[name]
+        job_start = time.perf_counter()
+        # jobs share the scraper session, so they never overlap
+        with self._lock:
+            try:
+                job()
+            except Exception as ex_:
+                print(f"[ERROR] from CollectorDaemon: {name} failed: {ex_}")
+                return
+        self.last_run[name] = {'time': time.time(), 'seconds': time.perf_counter() - job_start}
+
+    def analysis(self, symbol, max_age=SNAPSHOT_MAX_AGE):
+        item = self.pipeline.latest.get(symbol)
+        if item is None or time.time() - item[0] > max_age:
+            return None
+        return item[1]
+
+    def status(self):
+        return {
+            'symbols': sorted(self.pipeline.latest),
+            'last_run': dict(self.last_run),
+            'next_run': dict(self.next_due)
+        }
+
+    def handle(self, request):
+        command, args = request[0], request[1:]
+        if command == 'analysis':
+            return self.analysis(*args)
+        if command == 'status':
+            return self.status()
+        if command == 'run':
+            self.run_job(*args)
+            return self.last_run.get(args[0])
+        raise ValueError(f"unknown command {command}")
+
+    def _serve_connection(self, connection):
+        with connection:
+            try:
+                while True:
+                    request = connection.recv()
+                    try:
+                        connection.send(('ok', self.handle(request)))
+                    except Exception as ex_:
+                        connection.send(('error', str(ex_)))
+            except EOFError:
+                pass
+
+    def _serve(self):
+        while not self._stop.is_set():
+            try:
+                connection = self._listener.accept()
+            except AuthenticationError as ex_:
+                # a client with a wrong key must not take the listener down for everyone else
+                print(f"[ERROR] from CollectorDaemon: connection refused: {ex_}")
+                continue
+            except (OSError, EOFError) as ex_:
+                if self._stop.is_set():
+                    return
+                print(f"[ERROR] from CollectorDaemon: accept failed: {ex_}")
+                continue
+            threading.Thread(target=self._serve_connection, args=(connection,), daemon=True).start()
+
+    def start(self):
+        self._listener = Listener(self.address, authkey=self.authkey)
+        threading.Thread(target=self._serve, name="CollectorListener", daemon=True).start()
+        print(f"[INFO] from CollectorDaemon: listening on {self.address[0]}:{self.address[1]}")
+        return self
+
+    def run(self, collect_first=True):
+        self.start()
+        if collect_first:
+            self.run_job('collect')
+
+        while not self._stop.is_set():
+            name = min(self.next_due, key=self.next_due.get)
+            # sleep up to the next aligned run, overdue jobs run right away; stop() wakes the loop early
+            if self._stop.wait(max(0.0, self.next_due[name] - time.time())):
+                break
+            self.run_job(name)
+
+            _, period, offset = self.jobs[name]
+            self.next_due[name] = next_run(period, offset)
+
+    def stop(self):
+        self._stop.set()
+        if self._listener is not None:
+            self._listener.close()
+        self.pipeline.close()
+
+
+class CollectorClient:
+    def __init__(self, address=COLLECTOR_ADDRESS, authkey=None):
+        self.address = address
+        self.authkey = require_authkey(authkey)
+        self._connection = None
+
+    def request(self, *request):
+        if self._connection is None:
+            self._connection = Client(self.address, authkey=self.authkey)
+        try:
+            self._connection.send(request)
+            state, value = self._connection.recv()
+        except (EOFError, OSError, AuthenticationError):
+            self.close()
+            raise
+        if state == 'error':
+            raise RuntimeError(value)
+        return value
+
+    def analysis(self, symbol, max_age=SNAPSHOT_MAX_AGE):
+        return self.request('analysis', symbol, max_age)
+
+    def status(self):
+        return self.request('status')
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def daemon_analysis(symbol, max_age=SNAPSHOT_MAX_AGE, address=COLLECTOR_ADDRESS):
+    # None when no daemon is running or reachable, so callers fall back to their own analysis
+    if collector_authkey() is None:
+        return None
+
+    client = CollectorClient(address)
+    try:
+        return client.analysis(symbol, max_age)
+    except (EOFError, OSError, AuthenticationError, RuntimeError) as ex_:
+        if isinstance(ex_, AuthenticationError):
+            print(f"[ERROR] from daemon_analysis: collector daemon refused the key: {ex_}")
+        elif isinstance(ex_, RuntimeError):
+            print(f"[ERROR] from daemon_analysis: collector daemon failed the request: {ex_}")
+        return None
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    daemon = CollectorDaemon(test_mode=False)
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.stop()
@@ -1,26 +1,72 @@
+import time
+import argparse
+import pickle
+import hashlib
+
 import numpy as np
 from source.scraper import Scraper
 from source.analyzer import Analyzer
+from source.run_context import get_context
+from source.price_feed import start_price_feed
+from source.levels import LevelIndex, LEVEL_RESOLUTIONS, quote_history, last_candle
+from source.order_book import start_order_book
+from source.dashboard_server import DashboardServer, DashboardClient, SERVER_HOST, SERVER_PORT
 from config import current_symbol
 
+# seconds between refetches of each data source
+SOURCE_INTERVALS = {'common': 15 * 60, 'coin': 60, 'order_book': 10}
+MAX_REFRESH_RATE = 1.0
+
+
+def info_fingerprint(info):
+    try:
+        return hashlib.sha1(pickle.dumps(vars(info))).hexdigest()
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return None
+
 
 class Dashboard:
 
-    def __init__(self, symbol, test_mode):
+    def __init__(self, symbol, test_mode, context=None, order_book=None):
         print(f"\n\nDashboard Launched (SYMBOL SET UP AS {symbol})\n")
         self.test_mode = test_mode
+        self.symbol = symbol
+        self.context = context if context is not None else get_context(test_mode)
         self.scraper_obj = Scraper(symbol=symbol, print_opt=False, test_mode=test_mode)
+        self.level_index = LevelIndex()
+        self.fallback_levels = None
+
+        self.order_book = order_book
+        self.order_book_version = None
 
     def scrape(self):
         self.scraper_obj.parse_common()
-        self.scraper_obj.parse_coin_data()
-        self.scraper_obj.show_order_book()
+        self.parse_coin_data()
+        self.show_order_book()
         print("\n\n")
 
-    def key_info(self):
+    def show_order_book(self):
+        if self.order_book is None:
+            self.scraper_obj.show_order_book()
+            return True
+
+        if self.order_book.version == self.order_book_version:
+            return False
+        self.order_book_version = self.order_book.version
+        print(self.order_book.render())
+        return True
+
+    def parse_coin_data(self):
+        self.scraper_obj.parse_coin_data()
+        self.context.set_price(self.symbol, self.scraper_obj.info.course)
+
+    def analyse(self):
+        # the live order book only feeds the order book panel, the analysis keeps the scraped info
         analyzer_obj = Analyzer(self.scraper_obj.info, test_mode=self.test_mode)
         analyzer_obj.analyse()
+        return analyzer_obj
 
+    def key_info_data(self, analyzer_obj):
         ex = "Neutral"
         if analyzer_obj.conclusion["expectation"] < -0.5:
             ex = "Abnormal Negative"
@@ -31,51 +77,183 @@ class Dashboard:
         elif analyzer_obj.conclusion["expectation"] < -0.1:
             ex = "Negative"
 
-        print("EXPECTATION: ", analyzer_obj.conclusion["expectation"], f" ({ex})\n")
-
         vly = "Normal"
         if analyzer_obj.conclusion["volatility_index"] > 2:
             vly = "High"
         elif analyzer_obj.conclusion["volatility_index"] > 1:
             vly = "Low"
 
-        print("VOLATILITY: ", analyzer_obj.conclusion["volatility_index"], f" ({vly})\n")
-
         vlm = "Normal"
         if analyzer_obj.conclusion["volume_index"] < 0.8:
             vlm = "Abnormal Reduced"
         elif analyzer_obj.conclusion["volume_index"] < 0.7:
             vlm = "Reduced"
 
-        print("VOLUME: ", analyzer_obj.conclusion["volume_index"], f" ({vlm})\n")
+        local_levels, global_levels = self.levels(analyzer_obj)
+
+        return {
+            'symbol': self.symbol,
+            'price': self.context.price(self.symbol),
+            'expectation': analyzer_obj.conclusion["expectation"],
+            'expectation_label': ex,
+            'volatility': analyzer_obj.conclusion["volatility_index"],
+            'volatility_label': vly,
+            'volume': analyzer_obj.conclusion["volume_index"],
+            'volume_label': vlm,
+            'diff_24h': analyzer_obj.info.diff_24h,
+            'low_24h': analyzer_obj.info.low_24h,
+            'high_24h': analyzer_obj.info.high_24h,
+            'first_extremum': bool(analyzer_obj.info.first_extremum),
+            'local_levels': [list(np.ravel(side)) for side in local_levels],
+            'global_levels': [list(np.ravel(side)) for side in global_levels]
+        }
+
+    def levels(self, analyzer_obj):
+        prices = quote_history(analyzer_obj.info)
+        if prices is None:
+            # without a quote history the analyzer computes them; they only move once a candle closes
+            candle = last_candle()
+            if self.fallback_levels is None or self.fallback_levels[0] != candle:
+                self.fallback_levels = candle, (analyzer_obj.define_levels(*LEVEL_RESOLUTIONS['local']),
+                                                analyzer_obj.define_levels(*LEVEL_RESOLUTIONS['global']))
+            return self.fallback_levels[1]
+
+        levels = self.level_index.update(prices)
+        return levels['local'], levels['global']
+
+    @staticmethod
+    def render_panels(data):
+        panels = {
+            'price': f"PRICE:  {data['price']}  USDT\n",
+            'expectation': f"EXPECTATION:  {data['expectation']}  ({data['expectation_label']})\n",
+            'volatility': f"VOLATILITY:  {data['volatility']}  ({data['volatility_label']})\n",
+            'volume': f"VOLUME:  {data['volume']}  ({data['volume_label']})\n",
+            '24h': f"DIFFERENCE (24h) {data['diff_24h'] * 100} %\n"
+                   f"LOW (24h) {data['low_24h'] * 100} %\n"
+                   f"HIGH (24h) {data['high_24h'] * 100} %\n",
+            'extremum': f"first day extremum reached - {'HIGH' if data['first_extremum'] else 'LOW'}\n"
+        }
+
+        lines = []
+        for prefix, group in [['(-L) local ', data['local_levels']], ['(-G) global ', data['global_levels']]]:
+            for name, side in [['resistance level ', group[0]], ['support level ', group[1]]]:
+                for level in side:
+                    lines.append(prefix + name + str(level) + " USDT")
+                lines.append("")
+            lines.append("\n")
+        panels['levels'] = "\n".join(lines)
 
-        print("DIFFERENCE (24h)", analyzer_obj.info.diff_24h * 100, "%")
-        print("LOW (24h)", analyzer_obj.info.low_24h * 100, "%")
-        print("HIGH (24h)", analyzer_obj.info.high_24h * 100, "%\n")
+        return panels
 
-        if analyzer_obj.info.first_extremum:
-            print("first day extremum reached - HIGH\n")
+    def show_chart(self, data):
+        levels = np.concatenate(data['local_levels'] + data['global_levels'], axis=None)
+        self.scraper_obj.show_historical_quotes(levels, (12, 6))
+
+    def key_info(self):
+        data = self.key_info_data(self.analyse())
+
+        for text in self.render_panels(data).values():
+            print(text)
+
+        self.show_chart(data)
+
+
+class DashboardEngine:
+    def __init__(self, dashboard, intervals=None, max_refresh_rate=MAX_REFRESH_RATE):
+        self.dashboard = dashboard
+        self.intervals = dict(SOURCE_INTERVALS, **(intervals or {}))
+        self.min_period = 1 / max_refresh_rate
+
+        self.fetched = {name: None for name in self.intervals}
+        self.info_fingerprint = None
+        self.analyzer_obj = None
+        self.data = None
+        self.panels = {}
+
+    def due(self, name, now):
+        return self.fetched[name] is None or now - self.fetched[name] >= self.intervals[name]
+
+    def fetch(self, now):
+        refreshed = []
+        if self.due('common', now):
+            self.dashboard.scraper_obj.parse_common()
+            refreshed.append('common')
+        if self.due('coin', now):
+            self.dashboard.parse_coin_data()
+            refreshed.append('coin')
+        if self.due('order_book', now) and self.dashboard.show_order_book():
+            refreshed.append('order_book')
+
+        for name in refreshed:
+            self.fetched[name] = now
+        return refreshed
+
+    def step(self):
+        refreshed = self.fetch(time.monotonic())
+
+        # the analysis only depends on the scraped info, so it is reused until the info changes
+        fingerprint = info_fingerprint(self.dashboard.scraper_obj.info)
+        if fingerprint is None:
+            stale = 'common' in refreshed or 'coin' in refreshed
         else:
-            print("first day extremum reached - LOW\n")
+            stale = fingerprint != self.info_fingerprint
+        if self.analyzer_obj is None or stale:
+            self.analyzer_obj = self.dashboard.analyse()
+            self.info_fingerprint = fingerprint
+
+        data = self.dashboard.key_info_data(self.analyzer_obj)
+        panels = self.dashboard.render_panels(data)
+
+        changed = [name for name, text in panels.items() if self.panels.get(name) != text]
+        for name in changed:
+            print(panels[name])
 
-        local_levels = analyzer_obj.define_levels(6, 20)
-        global_levels = analyzer_obj.define_levels(3, 10)
+        levels_changed = self.data is None or (data['local_levels'], data['global_levels']) != (
+            self.data['local_levels'], self.data['global_levels'])
+        if levels_changed:
+            self.dashboard.show_chart(data)
 
-        levels = [['(-L) local ', local_levels], ['(-G) global ', global_levels]]
+        self.data = data
+        self.panels = panels
+        return changed
 
-        for group in levels:
-            group_levels = [['resistance level ', group[1][0]], ['support level ', group[1][1]]]
-            for subgroup in group_levels:
-                for level in subgroup[1]:
-                    print(group[0] + subgroup[0] + str(level) + " USDT")
-                print()
-            print("\n")
+    def run(self):
+        while True:
+            step_start = time.monotonic()
+            self.step()
+            time.sleep(max(0.0, self.min_period - (time.monotonic() - step_start)))
 
-        self.scraper_obj.show_historical_quotes(np.concatenate((local_levels, global_levels), axis=None), (12, 6))
 
+def view(url):
+    # a thin viewer: no scraper or analyzer, only the panels whose published fields changed are redrawn
+    client = DashboardClient(url)
+    panels = {}
+    for _ in client.subscribe():
+        if not client.data:
+            continue
 
-dashboard_obj = Dashboard(current_symbol, False)
+        rendered = Dashboard.render_panels(client.data)
+        for name, text in rendered.items():
+            if panels.get(name) != text:
+                print(text)
+        panels = rendered
 
-while True:
-    dashboard_obj.scrape()
-    dashboard_obj.key_info()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--serve", action="store_true", help="run the scrape loop once and publish it to viewers")
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--connect", metavar="URL", help="view the snapshots of a running dashboard server")
+    args = parser.parse_args()
+
+    if args.connect:
+        view(args.connect)
+    else:
+        dashboard_obj = Dashboard(current_symbol, False, order_book=start_order_book(current_symbol).book)
+        start_price_feed([current_symbol], dashboard_obj.context)
+
+        engine = DashboardEngine(dashboard_obj)
+        if args.serve:
+            DashboardServer(engine, SERVER_HOST, args.port).run()
+        else:
+            engine.run()
@@ -0,0 +1,156 @@
+import json
+import time
+import threading
+import collections
+import urllib.request
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+HISTORY_LENGTH = 256
+POLL_TIMEOUT = 30
+
+
+class SnapshotStore:
+    def __init__(self, history_length=HISTORY_LENGTH):
+        self.version = 0
+        self.data = {}
+        # (version, changed fields) of the latest publishes, for clients that are only a few versions behind
+        self.history = collections.deque(maxlen=history_length)
+        self._updated = threading.Condition()
+
+    def publish(self, data):
+        with self._updated:
+            changes = {key: value for key, value in data.items() if self.data.get(key) != value}
+            if not changes:
+                return self.version
+
+            self.version += 1
+            self.data = dict(data)
+            self.history.append((self.version, changes))
+            self._updated.notify_all()
+            return self.version
+
+    def snapshot(self):
+        with self._updated:
+            return {'version': self.version, 'full': True, 'data': dict(self.data)}
+
+    def changes(self, since, timeout=0):
+        with self._updated:
+            self._updated.wait_for(lambda: self.version > since, timeout)
+
+            if since >= self.version:
+                return {'version': self.version, 'full': False, 'data': {}}
+            if not self.history or self.history[0][0] > since + 1:
+                return {'version': self.version, 'full': True, 'data': dict(self.data)}
+
+            changes = {}
+            for version, fields in self.history:
+                if version > since:
+                    changes.update(fields)
+            return {'version': self.version, 'full': False, 'data': changes}
+
+
+class SnapshotHandler(BaseHTTPRequestHandler):
+    store = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+
+        if url.path == "/snapshot":
+            body = self.store.snapshot()
+        elif url.path == "/changes":
+            try:
+                since = int(query.get('since', ['0'])[0])
+                timeout = min(float(query.get('timeout', ['0'])[0]), POLL_TIMEOUT)
+            except ValueError:
+                self.send_error(400, "since and timeout must be numbers")
+                return
+            body = self.store.changes(since, timeout)
+        else:
+            self.send_error(404)
+            return
+
+        payload = json.dumps(body, default=float).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class DashboardServer:
+    def __init__(self, engine, host=SERVER_HOST, port=SERVER_PORT, store=None):
+        self.engine = engine
+        self.store = store if store is not None else SnapshotStore()
+
+        handler = type("BoundSnapshotHandler", (SnapshotHandler,), {'store': self.store})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="DashboardServer", daemon=True)
+        self._thread.start()
+        print(f"[INFO] from DashboardServer: serving snapshots on {self.url}")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def run(self):
+        # one scrape/analysis loop, however many viewers are connected
+        self.start()
+        try:
+            while True:
+                step_start = time.monotonic()
+                self.engine.step()
+                self.store.publish(self.engine.data)
+                time.sleep(max(0.0, self.engine.min_period - (time.monotonic() - step_start)))
+        finally:
+            self.stop()
+
+
+class DashboardClient:
+    def __init__(self, url, timeout=POLL_TIMEOUT):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.version = 0
+        self.data = {}
+
+    def _get(self, path):
+        with urllib.request.urlopen(self.url + path, timeout=self.timeout + 5) as response:
+            return json.loads(response.read())
+
+    def snapshot(self):
+        body = self._get("/snapshot")
+        self.version, self.data = body['version'], body['data']
+        return self.data
+
+    def poll(self):
+        body = self._get(f"/changes?since={self.version}&timeout={self.timeout}")
+        if body['full']:
+            self.data = body['data']
+        else:
+            self.data.update(body['data'])
+        self.version = body['version']
+        return body['data']
+
+    def subscribe(self):
+        """Yield the fields changed by every new version, starting with the whole snapshot."""
+        yield self.snapshot()
+        while True:
+            changes = self.poll()
+            if changes:
+                yield changes
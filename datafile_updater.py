@@ -0,0 +1,62 @@
+import time
+
+import numpy as np
+from source.scraper import Scraper
+from source.analyzer import Analyzer
+from source.sample_store import SampleStore, datafile_key
+
+
+class PendingIndex:
+    def __init__(self, store):
+        self.store = store
+
+    def build(self):
+        """ticker -> datafile indexes of the records still waiting for a result."""
+        index = {}
+        for ticker in self.store.tickers():
+            partition = self.store.partition(ticker)
+            result = partition.column("Result")
+
+            # a record is pending while any of its time frames has no result yet
+            pending = np.flatnonzero(np.isnan(result[:, :, 0]).any(axis=1))
+            if len(pending) == 0:
+                continue
+
+            datafile_indexes = partition.meta['datafile_indexes']
+            index[ticker] = {datafile_indexes[i] for i in pending}
+        return index
+
+
+class DatafileUpdater:
+    def __init__(self, test_mode=True, store=None, scraper_obj=None):
+        self.test_mode = test_mode
+        self.store = store if store is not None else SampleStore(test_mode=test_mode)
+        self.scraper_obj = scraper_obj if scraper_obj is not None else Scraper(print_opt=False, test_mode=test_mode)
+
+    def run(self):
+        run_start = time.perf_counter()
+
+        index = PendingIndex(self.store).build()
+        if not index:
+            print("[INFO] from DatafileUpdater.run: no pending results")
+            return 0
+
+        analyzer_obj = Analyzer(info=self.scraper_obj.info, test_mode=self.test_mode)
+        groups = {}
+        for item in analyzer_obj.deserialize():
+            ticker = item['Information']['Ticker']
+            if item['Information']['Datafile_index'] in index.get(ticker, ()):
+                groups.setdefault(ticker, []).append(item)
+
+        updated = 0
+        for ticker in sorted(groups):
+            items = groups[ticker]
+            items.sort(key=lambda item: datafile_key(item['Information']['Datafile_index']))
+            for item in items:
+                analyzer_obj.update_datafile(item, self.scraper_obj)
+            updated += len(items)
+            print(f"[INFO] from DatafileUpdater.run: {ticker} {len(items)} pending records")
+
+        print(f"[INFO] from DatafileUpdater.run: {updated} pending records of {len(groups)} tickers updated in "
+              f"{time.perf_counter() - run_start:.1f} s")
+        return updated
@@ -0,0 +1,140 @@
+import os
+import glob
+import hashlib
+
+import numpy as np
+from source.sample_store import SampleStore, INPUT_COLUMNS
+from source.signals import SIGNAL_FIELDS
+from source.profiler import get_profiler
+
+DATASET_CACHE_PATH = "dataset_cache/"
+
+
+class Dataset:
+    def __init__(self, ticker, arrays):
+        self.ticker = ticker
+        self.arrays = arrays
+        self.time_frames = [str(tf) for tf in arrays['time_frames']]
+
+    def keys(self, time_frame):
+        return self.arrays[f"keys__{time_frame}"]
+
+    def conclusions(self, time_frame):
+        return {field: self.arrays[f"conclusion__{time_frame}"][:, i] for i, field in enumerate(SIGNAL_FIELDS)}
+
+    def rows(self, time_frame, mode):
+        if time_frame not in self.time_frames:
+            raise KeyError(f"no {time_frame} results stored for ticker {self.ticker}")
+
+        mode = 'base' if mode == 'base' else 'full'
+        return self.arrays[f"x_{mode}__{time_frame}"], self.arrays[f"y__{time_frame}"], self.keys(time_frame)
+
+    def sample(self, time_frame, mode, limitation_ps=1, limitation_pr=60, with_keys=False):
+        input_values, output_values, keys = self.rows(time_frame, mode)
+        current_input = self.arrays[f"current_{'base' if mode == 'base' else 'full'}"]
+
+        if limitation_ps < len(input_values):
+            start = len(input_values) - limitation_pr
+            input_values, output_values, keys = input_values[start:], output_values[start:], keys[start:]
+
+        if limitation_ps > 1:
+            current_input = input_values[-limitation_ps]
+            input_values = input_values[0:-limitation_ps]
+            output_values = output_values[0:-limitation_ps]
+            keys = keys[0:-limitation_ps]
+
+        if with_keys:
+            return input_values, output_values, current_input, keys
+        return input_values, output_values, current_input
+
+
+class DatasetBuilder:
+    def __init__(self, test_mode=False, store=None, path=DATASET_CACHE_PATH):
+        self.store = store if store is not None else SampleStore(test_mode=test_mode)
+        self.path = os.path.join(path, "test" if test_mode else "main")
+        self._datasets = {}
+
+    def _tickers(self, ticker):
+        if ticker == 'all':
+            return self.store.tickers()
+        return [ticker]
+
+    def fingerprint(self, ticker):
+        tickers = self._tickers(ticker)
+        if len(tickers) == 1:
+            return self.store.partition(tickers[0]).fingerprint()
+
+        digest = hashlib.sha1()
+        for item in tickers:
+            digest.update(self.store.partition(item).fingerprint().encode())
+        return digest.hexdigest()
+
+    def build(self, ticker):
+        fingerprint = self.fingerprint(ticker)
+
+        cached = self._datasets.get(ticker)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+
+        cache_file = os.path.join(self.path, f"{ticker}_{fingerprint}.npz")
+        if os.path.exists(cache_file):
+            with np.load(cache_file) as file:
+                arrays = dict(file)
+        else:
+            with get_profiler().phase("dataset build"):
+                arrays = self._compute(ticker)
+                self._write(ticker, cache_file, arrays)
+
+        dataset = Dataset(ticker, arrays)
+        self._datasets[ticker] = (fingerprint, dataset)
+        return dataset
+
+    def _compute(self, ticker):
+        partitions = [self.store.partition(item) for item in self._tickers(ticker)]
+
+        time_frames = []
+        for partition in partitions:
+            for time_frame in partition.time_frames:
+                if time_frame not in time_frames:
+                    time_frames.append(time_frame)
+
+        arrays = {
+            'time_frames': np.array(time_frames),
+            'current_base': np.array(partitions[-1].inputs('base')[-1]),
+            'current_full': np.array(partitions[-1].inputs('full')[-1])
+        }
+
+        for time_frame in time_frames:
+            chunks = {'x_base': [], 'x_full': [], 'y': [], 'keys': [], 'conclusion': []}
+
+            for partition in partitions:
+                if time_frame not in partition.time_frames:
+                    continue
+                result = partition.result(time_frame)
+                filled = np.flatnonzero(~np.isnan(result[:, 0]))
+
+                chunks['x_base'].append(partition.column(INPUT_COLUMNS['base'])[filled])
+                chunks['x_full'].append(partition.column(INPUT_COLUMNS['full'])[filled])
+                chunks['y'].append(result[filled])
+                chunks['keys'].append(partition.keys[filled])
+                chunks['conclusion'].append(partition.conclusions()[filled])
+
+            for name, values in chunks.items():
+                arrays[f"{name}__{time_frame}"] = np.concatenate(values)
+
+        return arrays
+
+    def _write(self, ticker, cache_file, arrays):
+        os.makedirs(self.path, exist_ok=True)
+
+        for stale in glob.glob(os.path.join(self.path, f"{ticker}_*.npz")):
+            if stale != cache_file:
+                try:
+                    os.remove(stale)
+                except FileNotFoundError:
+                    pass
+
+        # a per-process hidden name, so the stale glob above never matches another writer's temp file
+        tmp_file = os.path.join(self.path, f".{os.path.basename(cache_file)}.{os.getpid()}.tmp.npz")
+        np.savez(tmp_file, **arrays)
+        os.replace(tmp_file, cache_file)
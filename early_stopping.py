@@ -0,0 +1,88 @@
+import numpy as np
+from source.import_file import keras
+
+
+class TargetReached:
+    def __init__(self, target, monitor='val_mape'):
+        self.target = target
+        self.monitor = monitor
+
+    def __call__(self, history):
+        return history[self.monitor][-1] <= self.target
+
+    def __str__(self):
+        return f"{self.monitor} target {self.target} reached"
+
+
+class SamplesDivergence:
+    def __init__(self, window=40, monitor='val_mape', train_monitor='mape'):
+        self.window = window
+        self.monitor = monitor
+        self.train_monitor = train_monitor
+
+    def __call__(self, history):
+        if len(history[self.monitor]) < 2 * self.window:
+            return False
+
+        # the train metric keeps falling while the validation one grows back
+        val = np.asarray(history[self.monitor][-2 * self.window:])
+        train = np.asarray(history[self.train_monitor][-2 * self.window:])
+        val_growth = val[self.window:].mean() > val[:self.window].mean()
+        train_fall = train[self.window:].mean() < train[:self.window].mean()
+        return val_growth and train_fall
+
+    def __str__(self):
+        return f"{self.train_monitor}/{self.monitor} divergence over {self.window} epochs"
+
+
+class EarlyStoppingEngine(keras.callbacks.Callback):
+    def __init__(self, criteria=(), min_epochs=20, max_epochs=2000, monitor='val_mape', restore_best_weights=True):
+        super().__init__()
+        self.criteria = list(criteria)
+        self.min_epochs = min_epochs
+        self.max_epochs = max_epochs
+        self.monitor = monitor
+        self.restore_best_weights = restore_best_weights
+
+        self.history = {}
+        self.best = np.inf
+        self.best_epoch = None
+        self.best_weights = None
+        self.stop_reason = None
+
+    def on_train_begin(self, logs=None):
+        self.history = {}
+        self.best = np.inf
+        self.best_epoch = None
+        self.best_weights = None
+        self.stop_reason = None
+
+    def on_epoch_end(self, epoch, logs=None):
+        for key, value in (logs or {}).items():
+            self.history.setdefault(key, []).append(value)
+
+        current = self.history[self.monitor][-1]
+        if current < self.best:
+            self.best = current
+            self.best_epoch = epoch
+            if self.restore_best_weights:
+                self.best_weights = self.model.get_weights()
+
+        epochs_done = epoch + 1
+        if epochs_done >= self.max_epochs:
+            self.stop_reason = "max epochs done"
+        elif epochs_done >= self.min_epochs:
+            for criterion in self.criteria:
+                if criterion(self.history):
+                    self.stop_reason = str(criterion)
+                    break
+
+        if self.stop_reason is not None:
+            self.model.stop_training = True
+
+    def on_train_end(self, logs=None):
+        if self.restore_best_weights and self.best_weights is not None:
+            self.model.set_weights(self.best_weights)
+
+        print(f" [INFO] TRAINING STOPPED AFTER {len(self.history.get(self.monitor, []))} EPOCHS ({self.stop_reason}), "
+              f"BEST {self.monitor} {self.best} ON EPOCH {self.best_epoch}")
@@ -0,0 +1,78 @@
+import os
+import json
+import time
+import threading
+
+EXCHANGE_INFO_PATH = "exchange_info.json"
+EXCHANGE_INFO_TTL = 6 * 60 * 60
+
+
+def index_symbols(exchange_info):
+    symbols = {}
+    for item in exchange_info['symbols']:
+        filters = {f['filterType']: f for f in item.get('filters', [])}
+        price_filter = filters.get('PRICE_FILTER', {})
+        lot_size = filters.get('LOT_SIZE', {})
+        market_lot_size = filters.get('MARKET_LOT_SIZE', lot_size)
+        min_notional = filters.get('MIN_NOTIONAL', {})
+
+        # filter values stay strings so prices and quantities can be rounded exactly
+        symbols[item['symbol']] = {
+            'quantityPrecision': item.get('quantityPrecision'),
+            'pricePrecision': item.get('pricePrecision'),
+            'tickSize': price_filter.get('tickSize'),
+            'minPrice': price_filter.get('minPrice'),
+            'maxPrice': price_filter.get('maxPrice'),
+            'stepSize': lot_size.get('stepSize'),
+            'minQty': lot_size.get('minQty'),
+            'maxQty': lot_size.get('maxQty'),
+            'marketStepSize': market_lot_size.get('stepSize'),
+            'marketMinQty': market_lot_size.get('minQty'),
+            'marketMaxQty': market_lot_size.get('maxQty'),
+            'minNotional': min_notional.get('notional', min_notional.get('minNotional'))
+        }
+    return symbols
+
+
+class ExchangeMetadataCache:
+    def __init__(self, client, path=EXCHANGE_INFO_PATH, ttl=EXCHANGE_INFO_TTL):
+        self.client = client
+        self.path = path
+        self.ttl = ttl
+
+        self.symbols = {}
+        self.updated = 0.0
+        self._lock = threading.Lock()
+
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, mode="r") as file:
+            data = json.load(file)
+        self.symbols = data['symbols']
+        self.updated = data['updated']
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, mode="w") as file:
+            json.dump({'updated': self.updated, 'symbols': self.symbols}, file)
+        os.replace(tmp_path, self.path)
+
+    def is_stale(self):
+        return time.time() - self.updated > self.ttl
+
+    def refresh(self):
+        with self._lock:
+            self.symbols = index_symbols(self.client.futures_exchange_info())
+            self.updated = time.time()
+            self._save()
+        print(f"[INFO] from ExchangeMetadataCache.refresh: {len(self.symbols)} symbols cached")
+
+    def get(self, symbol):
+        if self.is_stale() or symbol not in self.symbols:
+            self.refresh()
+        if symbol not in self.symbols:
+            raise KeyError(f"symbol {symbol} is not listed on the exchange")
+        return self.symbols[symbol]
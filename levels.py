@@ -0,0 +1,102 @@
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# name -> the define_levels(6, 20) and define_levels(3, 10) arguments of the dashboard, read here as
+# (levels per side, pivot half-window); Analyzer is not part of this repository, so check before relying on it
+LEVEL_RESOLUTIONS = {'local': (6, 20), 'global': (3, 10)}
+LEVEL_CANDLE = 60 * 60
+
+
+def last_candle(now=None, candle=LEVEL_CANDLE):
+    if now is None:
+        now = time.time()
+    return int(now // candle) * candle
+
+
+def quote_history(info):
+    quotes = getattr(info, 'quotes', None)
+    if quotes is None:
+        return None
+    return np.ravel(np.asarray(quotes, dtype='float64'))
+
+
+class LevelIndex:
+    def __init__(self, resolutions=None):
+        self.resolutions = dict(resolutions or LEVEL_RESOLUTIONS)
+        self.max_window = max(window for _, window in self.resolutions.values())
+
+        self.prices = np.empty(0)
+        self.pivots = {name: (np.empty(0, dtype=int), np.empty(0, dtype=int)) for name in self.resolutions}
+        self._levels = {}
+        self._key = None
+
+    def _pivots(self, prices, start):
+        # one sliding view over the widest window serves every resolution through centered slices
+        w = self.max_window
+        low = max(0, start - w)
+        padded = np.pad(prices[low:], (w - (start - low), w), mode='constant', constant_values=np.nan)
+        windows = sliding_window_view(padded, 2 * w + 1)
+        center = prices[start:]
+
+        found = {}
+        for name, (_, window) in self.resolutions.items():
+            span = windows[:, w - window:w + window + 1]
+            offset = np.arange(start, len(prices))
+
+            # a pivot needs a full window on both sides, so the last candles stay unconfirmed
+            confirmed = (offset >= window) & (offset < len(prices) - window)
+            highs = confirmed & (center == np.nanmax(span, axis=1))
+            lows = confirmed & (center == np.nanmin(span, axis=1))
+            found[name] = (offset[highs], offset[lows])
+        return found
+
+    def _shift(self, prices):
+        """Length of the prefix of self.prices dropped before prices, or None if prices does not continue it."""
+        old = self.prices
+        if len(old) == 0:
+            return None
+
+        # the latest match first, so a plain append is found before any shifted window
+        for j in np.flatnonzero(prices[:len(old)] == old[-1])[::-1]:
+            if np.array_equal(prices[:j + 1], old[len(old) - 1 - j:]):
+                return len(old) - 1 - j
+        return None
+
+    def update(self, prices):
+        prices = np.ravel(np.asarray(prices, dtype='float64'))
+        key = (len(prices), prices[-1] if len(prices) else None)
+        if key == self._key and np.array_equal(prices, self.prices):
+            return self._levels
+
+        shift = self._shift(prices)
+        if shift is None:
+            self.pivots = self._pivots(prices, 0)
+        else:
+            # only the candles whose window reaches the appended tail can change
+            start = max(0, len(self.prices) - shift - 2 * self.max_window)
+            fresh = self._pivots(prices, start)
+            for name, (_, window) in self.resolutions.items():
+                self.pivots[name] = tuple(
+                    np.concatenate([kept[(kept - shift >= window) & (kept - shift < start)] - shift, new])
+                    for kept, new in zip(self.pivots[name], fresh[name]))
+
+        self.prices = prices
+        self._key = key
+        self._levels = {name: self._select(name) for name in self.resolutions}
+        return self._levels
+
+    def _select(self, name):
+        count = self.resolutions[name][0]
+        if len(self.prices) == 0:
+            return [[], []]
+        price = self.prices[-1]
+        highs, lows = (np.unique(self.prices[index]) for index in self.pivots[name])
+
+        resistance = highs[highs > price][:count]
+        support = lows[lows < price][::-1][:count]
+        return [[float(level) for level in resistance], [float(level) for level in support]]
+
+    def levels(self, name):
+        return self._levels.get(name, [[], []])
@@ -1,36 +1,54 @@
 import numpy as np
 from datetime import datetime
-from source.analyzer import get_date_time
 from source.neural_network import NeuralNetwork
+from source.dataset_builder import DatasetBuilder
+from source.profiler import reset_profiler, load_records, compare
+from source.report_log import prediction_log
 from config import current_symbol
 
 EPOCHS = 4500
 LIMITATION = 30
+TIME_FRAME = 'Difference_1D'
 
+WARM_START = True
+FINE_TUNE_EPOCHS = 150
 
-def write_prediction_report(signal_to_report, epochs_num_used, limitation_used):
-    with open("prediction_reports.txt", mode="a") as file:
-        file.write(f"{signal_to_report};{epochs_num_used};{limitation_used};{get_date_time()}\n")
 
+def write_prediction_report(signal_to_report, strength_to_report, epochs_num_used, limitation_used, time_frame):
+    prediction_log().append(symbol=current_symbol, time_frame=time_frame, prediction=signal_to_report,
+                            strength=strength_to_report, epochs=epochs_num_used, limitation=limitation_used)
+
+
+def fit(time_frame, test_mode, dataset=None):
+    ticker = current_symbol.replace("USDT", "")
+    if dataset is None:
+        dataset = DatasetBuilder(test_mode=test_mode).build(ticker)
+
+    model = NeuralNetwork(ticker=ticker, mode="full", model_struct=3, time_frame=time_frame, limitation_ps=1,
+                          limitation_pr=LIMITATION, show_plots=False, test_mode=test_mode, dataset=dataset)
+    model.train(EPOCHS, fine_tune_epochs=FINE_TUNE_EPOCHS, warm_start=WARM_START)
 
-def fit(time_frame, test_mode):
-    model = NeuralNetwork(ticker=current_symbol.replace("USDT", ""), mode="full", model_struct=3, time_frame=time_frame,
-                          limitation_ps=1, limitation_pr=LIMITATION, show_plots=False, test_mode=test_mode)
-    model.fit(EPOCHS, 0)
     print("\n", model.predict(), "\n")
     model.show_fit_results()
     return model
 
 
 time_start = datetime.now()
+profiler = reset_profiler("model")
 
-result = fit(time_frame='Difference_1D', test_mode=False)
+result = fit(time_frame=TIME_FRAME, test_mode=False)
 signal, strength = result.get_signal(test_mode=False)
 
 print(f"{signal} ({strength})")
-write_prediction_report(np.round(result.prediction[0], 4), EPOCHS, LIMITATION)
+write_prediction_report(np.round(result.prediction[0], 4), strength, result.epochs_used, LIMITATION, TIME_FRAME)
 
 time_finish = datetime.now()
 
 execution_time = time_finish - time_start
 print(f"execution time: {execution_time} (s)")
+
+previous_records = load_records(name="model")
+profile_record = profiler.write()
+if previous_records:
+    for regression in compare(previous_records[-1], profile_record):
+        print(f"[WARNING] performance regression: {regression}")
@@ -1,29 +1,52 @@
+import os
+import glob
+import json
 import datetime
 
 import numpy as np
-from numpy import array, zeros
+from numpy import zeros
 from numpy import expand_dims
 from matplotlib import pyplot as plt
-from source.analyzer import Analyzer
-from source.scraper import Scraper
+from source.dataset_builder import DatasetBuilder
+from source.predictions import order_predictions, prediction_values
+from source.numpy_inference import checkpoint_prefix, export_dense_weights
+from source.early_stopping import EarlyStoppingEngine, SamplesDivergence, TargetReached
+from source.run_context import get_context
+from source.profiler import get_profiler
+from source.signals import signal_strength, signal_label
 from source.import_file import keras
 from config import model_repository_path
 
 
 class NeuralNetwork:
     def __init__(self, ticker, mode, model_struct, time_frame, limitation_ps=1, limitation_pr=60, show_plots=False,
-                 test_mode=False):
+                 test_mode=False, dataset=None, context=None):
 
         self.show_plots = show_plots
+        self.context = context
 
-        self.x, self.y, self.cri = self.extract_sample(ticker, time_frame, mode, limitation_ps=limitation_ps,
-                                                       limitation_pr=limitation_pr, test_mode=test_mode)
+        with get_profiler().phase("dataset"):
+            if dataset is None:
+                store = self.run_context(test_mode).sample_store()
+                dataset = DatasetBuilder(test_mode=test_mode, store=store).build(ticker)
+
+            self.x, self.y, self.cri, self.keys = dataset.sample(time_frame, mode, limitation_ps=limitation_ps,
+                                                                 limitation_pr=limitation_pr, with_keys=True)
         self.ticker = ticker
         self.mode = mode
+        self.model_struct = model_struct
+        self.time_frame = time_frame
 
         self.prediction = None
         self.normal_output = None
 
+        self.trained_until = None
+        self.epochs_used = 0
+
+        with get_profiler().phase("model construction"):
+            self.build_model(model_struct, mode)
+
+    def build_model(self, model_struct, mode):
         act_f = keras.activations.tanh
 
         if mode != 'full':
@@ -166,68 +189,27 @@ class NeuralNetwork:
                 metrics=['mape']
             )
 
-    @staticmethod
-    def extract_sample(ticker, time_frame, mode, limitation_ps, limitation_pr, test_mode=False):
-        analyzer_obj = Analyzer(test_mode=test_mode)
-
-        des = analyzer_obj.deserialize()
-        data = []
-
-        if ticker != 'all':
-            for item in des:
-                if item['Information']['Ticker'] == ticker:
-                    data.append(item)
-
-            indexes = []
-            sorted_data = []
-
-            for item in data:
-                test = 0
-                if 'test' in item['Information']['Datafile_index']:
-                    test = 1
-                dfx = item['Information']['Datafile_index'].split('.')
-                indexes.append(int(dfx[0 + test]) * 365 + int(dfx[1 + test]))
-
-            min_idx = min(indexes)
-
-            for i in range(len(data) + 1):
-                try:
-                    idx = indexes.index(min_idx + i)
-                except ValueError:
-                    continue
-                sorted_data.append(data[idx])
-        else:
-            sorted_data = data
+    def run_context(self, test_mode):
+        if self.context is not None and self.context.test_mode == test_mode:
+            return self.context
+        return get_context(test_mode)
 
-        if mode == 'base':
-            path = 'Model_input_base'
-        else:
-            path = "Model_input_full"
-
-        input_values = []
-        output_values = []
-        current_input = sorted_data[-1][path]
-        for item in sorted_data:
-            if item['Result'][time_frame] is not None:
-                input_values.append(item[path])
-                output_values.append(item['Result'][time_frame])
-
-        input_values, output_values, current_input = array(input_values), array(output_values, dtype='float64'), array(
-            current_input, dtype='float64')
-
-        if limitation_ps < len(input_values):
-            input_values = input_values[len(input_values) - limitation_pr:]
-            output_values = output_values[len(output_values) - limitation_pr:]
+    @staticmethod
+    def extract_sample(ticker, time_frame, mode, limitation_ps, limitation_pr, test_mode=False, dataset=None):
+        if dataset is None:
+            dataset = DatasetBuilder(test_mode=test_mode).build(ticker)
 
-        if limitation_ps > 1:
-            current_input = input_values[-limitation_ps]
-            input_values = input_values[0:-limitation_ps]
-            output_values = output_values[0:-limitation_ps]
+        return dataset.sample(time_frame, mode, limitation_ps=limitation_ps, limitation_pr=limitation_pr)
 
-        return input_values, output_values, current_input
+    def epoch_callbacks(self, samples, validation_split=0.0):
+        return [get_profiler().epoch_callback(int(samples * (1 - validation_split)))]
 
     def fit(self, epochs, validation_split=0.2):
-        hist = self.model.fit(self.x, self.y, epochs=epochs, validation_split=validation_split).history
+        with get_profiler().phase("fit"):
+            hist = self.model.fit(self.x, self.y, epochs=epochs, validation_split=validation_split,
+                                  callbacks=self.epoch_callbacks(len(self.x), validation_split)).history
+        self.epochs_used = len(hist['loss'])
+        self.trained_until = self.last_key()
 
         if self.show_plots:
             if 'val_mape' in hist:
@@ -240,54 +222,106 @@ class NeuralNetwork:
         else:
             return hist['mape'][-1]
 
+    def last_key(self):
+        if len(self.keys) == 0:
+            return None
+        return int(self.keys[-1])
+
+    def checkpoint_prefix(self):
+        return checkpoint_prefix(self.ticker, self.mode, self.model_struct, self.time_frame)
+
     def save_model(self):
-        self.model.save(model_repository_path + str(datetime.datetime.now().date()))
+        name = self.checkpoint_prefix() + str(datetime.datetime.now().date())
+        self.model.save(model_repository_path + name)
+        export_dense_weights(self.model, model_repository_path + name + ".npz")
+
+        with open(model_repository_path + name + ".json", mode="w") as file:
+            json.dump({'trained_until': self.trained_until, 'epochs_used': self.epochs_used}, file)
 
     def load_model(self, name):
         self.model = keras.models.load_model(model_repository_path + name)
 
-    def fit_special(self, min_ep=20, max_ep=2000, block=40, target=None, validation_split=0.2):
+    def find_checkpoint(self):
+        checkpoints = sorted(glob.glob(model_repository_path + self.checkpoint_prefix() + "*.json"))
+        if not checkpoints:
+            return None
+        return os.path.basename(checkpoints[-1])[:-len(".json")]
 
-        hist = self.model.fit(self.x, self.y, epochs=3 * block + 1, validation_split=validation_split).history
+    def warm_start(self):
+        name = self.find_checkpoint()
+        if name is None:
+            return False
 
-        for i in range(100):
-            if i * block > max_ep:
-                break
+        with open(model_repository_path + name + ".json", mode="r") as file:
+            self.trained_until = json.load(file)['trained_until']
+
+        # weights go into the freshly compiled model so the struct's optimizer settings are kept
+        self.model.set_weights(keras.models.load_model(model_repository_path + name).get_weights())
+        print(f" [INFO] WARM START FROM {name}")
+        return True
+
+    def train(self, epochs, fine_tune_epochs=150, warm_start=True):
+        if warm_start and self.warm_start():
+            self.fine_tune(fine_tune_epochs)
+        else:
+            self.fit(epochs, 0)
+        self.save_model()
 
-            no_target_reached = (target is not None and hist['val_mape'][-1] > target)
+    def fine_tune(self, max_epochs=150):
+        new_samples = np.ones(len(self.keys), dtype=bool)
+        if self.trained_until is not None:
+            new_samples = self.keys > self.trained_until
 
-            no_min_epochs_done = (target is None and len(hist['mape']) < min_ep)
-            no_samples_divergence = (no_min_epochs_done and (
-                    hist['val_mape'][-1] < hist['val_mape'][-(2 * block)]) and (
-                                             hist['mape'][-1] < hist['mape'][-(2 * block)]))
+        self.epochs_used = 0
+        if not new_samples.any():
+            return None
 
-            if no_target_reached or no_min_epochs_done or no_samples_divergence:
-                next_epoch = self.model.fit(self.x, self.y, epochs=block, validation_split=validation_split).history
-                hist['val_mape'] += next_epoch['val_mape']
-                hist['mape'] += next_epoch['mape']
+        with get_profiler().phase("fine tune"):
+            hist = self.model.fit(self.x[new_samples], self.y[new_samples], epochs=max_epochs,
+                                  callbacks=self.epoch_callbacks(np.count_nonzero(new_samples))).history
+        self.epochs_used = len(hist['loss'])
+        self.trained_until = self.last_key()
+
+        return hist['mape'][-1]
+
+    def fit_special(self, min_ep=20, max_ep=2000, block=40, target=None, validation_split=0.2):
+        monitor = 'mape'
+        criteria = []
+        if validation_split != 0:
+            monitor = 'val_mape'
+            criteria.append(SamplesDivergence(window=block, monitor=monitor))
+        if target is not None:
+            criteria.append(TargetReached(target, monitor=monitor))
+
+        engine = EarlyStoppingEngine(criteria, min_epochs=min_ep, max_epochs=max_ep, monitor=monitor)
+        with get_profiler().phase("fit"):
+            hist = self.model.fit(self.x, self.y, epochs=max_ep, validation_split=validation_split,
+                                  callbacks=[engine] + self.epoch_callbacks(len(self.x), validation_split)).history
+        self.epochs_used = len(hist['loss'])
+        self.trained_until = self.last_key()
 
         if self.show_plots:
             if 'val_mape' in hist:
                 plt.plot(hist['val_mape'], 'g--')
             plt.plot(hist['mape'], 'b')
+            plt.axvline(engine.best_epoch, color='orange')
             plt.show()
 
-        if validation_split != 0:
-            return hist['val_mape'][-1]
-        else:
-            return hist['mape'][-1]
+        return engine.best
+
+    def predict_batch(self, model_input=None):
+        if model_input is None:
+            model_input = self.x
+        with get_profiler().phase("predict"):
+            return order_predictions(self.model.predict(np.asarray(model_input, dtype='float64')))
 
     def predict(self, model_input=None):
         if model_input is None:
             model_input = self.cri
-        self.prediction = self.model.predict(expand_dims(model_input, axis=0))[0]
+        prediction = self.predict_batch(expand_dims(model_input, axis=0))[0]
 
-        if self.prediction[2] > self.prediction[0] > self.prediction[1]:
-            self.normal_output = True
-        else:
-            self.normal_output = False
-            sorted_pr = np.sort(self.prediction[:-1])
-            self.prediction = [sorted_pr[1], sorted_pr[0], sorted_pr[2], self.prediction[-1]]
+        self.normal_output = bool(prediction['normal'])
+        self.prediction = prediction_values(prediction)
 
         return self.prediction
 
@@ -296,82 +330,28 @@ class NeuralNetwork:
         if self.ticker == 'all':
             self.ticker = "BTC"
 
-        if self.prediction[0] > 0:
-            signal = 1
-        else:
-            signal = -1
-
         print(f" [INFO] PREDICTION [TOTAL] {self.prediction[0] * 100} %")
         print(f" [INFO] PREDICTION [MIN] {self.prediction[1] * 100} %")
         print(f" [INFO] PREDICTION [MAX] {self.prediction[2] * 100} %")
         print(f" [INFO] PREDICTION [FIRST-EXTREMUM] {self.prediction[3]}\n\n")
 
-        analyzer_obj = Analyzer(test_mode=test_mode)
-        data = analyzer_obj.deserialize()
-
-        necessary_data = []
-
-        for item in data:
-            if item['Information']['Ticker'] == self.ticker:
-                necessary_data.append(item)
-
-        last_item = necessary_data[-1]['Conclusion']
+        context = self.run_context(test_mode)
+        with get_profiler().phase("last conclusion"):
+            last_item = context.last_conclusion(self.ticker)
 
-        if last_item['RSI'] > 60 and last_item['CCI20'] > 90 and signal < 0:
-            signal -= 1
-        elif last_item['RSI'] < 40 and last_item['CCI20'] < -90 and signal > 0:
-            signal += 1
+        signal = int(signal_strength(self.prediction[0], last_item))
 
-        if last_item['RSI'] > 60 and last_item['Stoch.K'] > 70 and signal < 0:
-            signal -= 1
-        elif last_item['RSI'] < 40 and last_item['Stoch.K'] < 30 and signal > 0:
-            signal += 1
-
-        if last_item['Mom'] > 0 and last_item['MACD.macd'] > 0 and -signal > 0:
-            signal -= 1
-        elif last_item['Mom'] < 0 and last_item['MACD.macd'] < 0 and -signal < 0:
-            signal += 1
-
-        if last_item['P.SAR'] > 1 and last_item['HullMA9'] > 1 and signal < 0:
-            signal -= 1
-        elif last_item['P.SAR'] < 1 and last_item['HullMA9'] < 1 and signal > 0:
-            signal += 1
-
-        if last_item['BB.upper'] > 1 and last_item['Ichimoku.BLine'] > 1 and signal < 0:
-            signal -= 1
-        elif last_item['BB.lower'] < 1 and last_item['Ichimoku.BLine'] < 1 and signal > 0:
-            signal += 1
-
-        if last_item["expectation"] < 0 and signal < 0:
-            signal -= 1
-        elif last_item["expectation"] > 0 and signal > 0:
-            signal += 1
-
-        if last_item["tw_summary"] < 0 and signal < 0:
-            signal -= 1
-        elif last_item["tw_summary"] > 0 and signal > 0:
-            signal += 1
-
-        scraper_obj = Scraper(test_mode=test_mode)
-        scraper_obj.parse_course(symbol=self.ticker + "USDT")
+        with get_profiler().phase("price"):
+            course = context.price(self.ticker + "USDT")
 
         if self.prediction[3] > 0.5:
-            print(f"\n\n [INFO] RECOMMENDATION [SHORT] FROM {scraper_obj.info.course * (1 + self.prediction[2])}")
-            print(f" [INFO] WITH TARGET {scraper_obj.info.course * (1 + self.prediction[1])}")
-        else:
-            print(f" [INFO] RECOMMENDATION [LONG] FROM {scraper_obj.info.course * (1 + self.prediction[1])}")
-            print(f" [INFO] WITH TARGET {scraper_obj.info.course * (1 + self.prediction[2])}\n\n")
-
-        if signal >= 3 and self.prediction[0] > 0.03:
-            return "confirmed signal (POSITIVE)", signal
-        elif signal <= -3 and self.prediction[0] < -0.03:
-            return "confirmed signal (NEGATIVE)", signal
-        elif signal >= 2:
-            return "little confirmed signal (POSITIVE)", signal
-        elif signal <= -2:
-            return "little confirmed signal (NEGATIVE)", signal
+            print(f"\n\n [INFO] RECOMMENDATION [SHORT] FROM {course * (1 + self.prediction[2])}")
+            print(f" [INFO] WITH TARGET {course * (1 + self.prediction[1])}")
         else:
-            return "too weak signal (or signal didn't confirm)", signal
+            print(f" [INFO] RECOMMENDATION [LONG] FROM {course * (1 + self.prediction[1])}")
+            print(f" [INFO] WITH TARGET {course * (1 + self.prediction[2])}\n\n")
+
+        return signal_label(signal, self.prediction[0]), signal
 
     def show_fit_results(self):
         length = len(self.y)
@@ -379,15 +359,8 @@ class NeuralNetwork:
         plt.plot([100 * i[0] for i in self.y], "b")
         plt.plot(zeros(length), 'b--')
 
-        for i in range(length):
-            self.predict(self.x[i])
-
-            if self.prediction[0] > 0:
-                color = "green"
-            else:
-                color = "red"
-
-            plt.scatter(i, 100 * self.prediction[0], color=color)
+        fit_predictions = self.predict_batch(self.x)['total']
+        plt.scatter(np.arange(length), 100 * fit_predictions, color=np.where(fit_predictions > 0, "green", "red"))
 
         plt.scatter(length, 100 * self.predict()[0], color="orange")
         plt.plot(zeros(length) + (100 * self.prediction[2]), 'g--')
@@ -0,0 +1,77 @@
+import glob
+
+import numpy as np
+from source.predictions import order_predictions, prediction_values
+from config import model_repository_path
+
+SELU_ALPHA = 1.6732632423543772
+SELU_SCALE = 1.0507009873554805
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'tanh': np.tanh,
+    'relu': lambda x: np.maximum(x, 0),
+    'selu': lambda x: SELU_SCALE * np.where(x > 0, x, SELU_ALPHA * np.expm1(np.minimum(x, 0)))
+}
+
+
+def checkpoint_prefix(ticker, mode, model_struct, time_frame):
+    return f"{ticker}_{mode}_{model_struct}_{time_frame}_"
+
+
+def export_dense_weights(model, path):
+    arrays = {}
+    activations = []
+    for i, layer in enumerate(model.layers):
+        activation = layer.get_config()['activation']
+        if activation not in ACTIVATIONS:
+            raise ValueError(f"activation {activation} of layer {layer.name} has no NumPy implementation")
+
+        kernel, bias = layer.get_weights()
+        arrays[f"kernel_{i}"] = kernel
+        arrays[f"bias_{i}"] = bias
+        activations.append(activation)
+
+    np.savez(path, activations=np.array(activations), **arrays)
+
+
+class NumpyPredictor:
+    def __init__(self, layers):
+        self.layers = layers
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as file:
+            layers = [(file[f"kernel_{i}"], file[f"bias_{i}"], str(activation))
+                      for i, activation in enumerate(file['activations'])]
+        return cls(layers)
+
+    @classmethod
+    def from_checkpoint(cls, ticker, mode, model_struct, time_frame):
+        prefix = checkpoint_prefix(ticker, mode, model_struct, time_frame)
+        exports = sorted(glob.glob(model_repository_path + prefix + "*.npz"))
+        if not exports:
+            raise FileNotFoundError(f"no exported weights for {prefix}*")
+        return cls.load(exports[-1])
+
+    def forward(self, model_input):
+        values = np.asarray(model_input, dtype=self.layers[0][0].dtype)
+        for kernel, bias, activation in self.layers:
+            values = ACTIVATIONS[activation](values @ kernel + bias)
+        return values
+
+    def predict_batch(self, model_input):
+        return order_predictions(self.forward(np.atleast_2d(model_input)))
+
+    def predict(self, model_input):
+        return prediction_values(self.predict_batch(model_input)[0])
+
+
+def latest_prediction(ticker, time_frame, mode='full', model_struct=3, test_mode=False, store=None):
+    # only the latest input row is read from the store, so neither keras nor the analyzer get imported
+    from source.sample_store import SampleStore
+
+    if store is None:
+        store = SampleStore(test_mode=test_mode)
+    current_input = store.partition(ticker).inputs(mode)[-1]
+    return NumpyPredictor.from_checkpoint(ticker, mode, model_struct, time_frame).predict(current_input)
@@ -0,0 +1,224 @@
+import json
+import threading
+
+from sortedcontainers import SortedDict
+
+FUTURES_DEPTH_URL = "wss://fstream.binance.com/ws/"
+SNAPSHOT_LIMIT = 1000
+RECONNECT_DELAY = 1
+MAX_RECONNECT_DELAY = 60
+RECEIVE_TIMEOUT = 30
+
+
+class OrderBookGap(Exception):
+    pass
+
+
+class OrderBook:
+    def __init__(self, symbol):
+        self.symbol = symbol
+        # bids are keyed by the negated price, so both sides iterate best level first
+        self.bids = SortedDict()
+        self.asks = SortedDict()
+
+        self.last_update_id = None
+        self.version = 0
+        self._synced = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _set(side, key, quantity):
+        if quantity == 0:
+            side.pop(key, None)
+        else:
+            side[key] = quantity
+
+    def load_snapshot(self, snapshot):
+        with self._lock:
+            self.bids.clear()
+            self.asks.clear()
+            for price, quantity in snapshot['bids']:
+                self._set(self.bids, -float(price), float(quantity))
+            for price, quantity in snapshot['asks']:
+                self._set(self.asks, float(price), float(quantity))
+
+            self.last_update_id = snapshot['lastUpdateId']
+            self._synced = False
+            self.version += 1
+
+    def apply_diff(self, event):
+        """Apply one depthUpdate event, raising OrderBookGap when the stream skipped updates."""
+        with self._lock:
+            if self.last_update_id is None:
+                raise OrderBookGap(f"no snapshot loaded for {self.symbol}")
+            if event['u'] < self.last_update_id:
+                return False
+
+            if not self._synced:
+                if event['U'] > self.last_update_id:
+                    raise OrderBookGap(f"first update {event['U']} is past snapshot {self.last_update_id}")
+            elif event.get('pu', self.last_update_id) != self.last_update_id:
+                raise OrderBookGap(f"update {event['u']} does not follow {self.last_update_id}")
+
+            for price, quantity in event['b']:
+                self._set(self.bids, -float(price), float(quantity))
+            for price, quantity in event['a']:
+                self._set(self.asks, float(price), float(quantity))
+
+            self.last_update_id = event['u']
+            self._synced = True
+            self.version += 1
+            return True
+
+    def best_bid(self):
+        with self._lock:
+            return -self.bids.peekitem(0)[0] if self.bids else None
+
+    def best_ask(self):
+        with self._lock:
+            return self.asks.peekitem(0)[0] if self.asks else None
+
+    def mid_price(self):
+        bid, ask = self.best_bid(), self.best_ask()
+        if bid is None or ask is None:
+            return None
+        return (bid + ask) / 2
+
+    def top(self, n=10):
+        with self._lock:
+            bids = [(-price, self.bids[price]) for price in self.bids.islice(0, n)]
+            asks = [(price, self.asks[price]) for price in self.asks.islice(0, n)]
+        return bids, asks
+
+    def imbalance(self, n=10):
+        """(bid volume - ask volume) / total volume over the top n levels, from -1 (all asks) to 1 (all bids)."""
+        bids, asks = self.top(n)
+        bid_volume = sum(quantity for _, quantity in bids)
+        ask_volume = sum(quantity for _, quantity in asks)
+        if bid_volume + ask_volume == 0:
+            return 0.0
+        return (bid_volume - ask_volume) / (bid_volume + ask_volume)
+
+    def walls(self, n=50, factor=5.0):
+        """Levels within the top n holding at least factor times the average level quantity."""
+        bids, asks = self.top(n)
+        walls = []
+        for levels in (bids, asks):
+            if not levels:
+                walls.append([])
+                continue
+            average = sum(quantity for _, quantity in levels) / len(levels)
+            walls.append([(price, quantity) for price, quantity in levels if quantity >= factor * average])
+        return walls
+
+    def summary(self, n=10):
+        bids, asks = self.top(n)
+        return {
+            'symbol': self.symbol,
+            'last_update_id': self.last_update_id,
+            'bids': bids,
+            'asks': asks,
+            'imbalance': self.imbalance(n),
+            'walls': self.walls()
+        }
+
+    def render(self, n=10):
+        bids, asks = self.top(n)
+        lines = [f"ORDER BOOK {self.symbol}"]
+        for price, quantity in reversed(asks):
+            lines.append(f"  ask  {price}  {quantity}")
+        lines.append("  ----")
+        for price, quantity in bids:
+            lines.append(f"  bid  {price}  {quantity}")
+        lines.append(f"IMBALANCE (top {n}):  {self.imbalance(n):.3f}")
+        return "\n".join(lines) + "\n"
+
+
+class BinanceDepthSource:
+    finite = False
+
+    def __init__(self, symbol, client, url=FUTURES_DEPTH_URL, limit=SNAPSHOT_LIMIT, timeout=RECEIVE_TIMEOUT):
+        self.symbol = symbol
+        self.client = client
+        self.url = url + f"{symbol.lower()}@depth@100ms"
+        self.limit = limit
+        self.timeout = timeout
+
+    def snapshot(self):
+        return self.client.futures_order_book(symbol=self.symbol, limit=self.limit)
+
+    def events(self):
+        import websocket
+
+        connection = websocket.create_connection(self.url, timeout=self.timeout)
+        try:
+            while True:
+                yield json.loads(connection.recv())
+        finally:
+            connection.close()
+
+
+class OrderBookFeed:
+    def __init__(self, source, book=None, reconnect_delay=RECONNECT_DELAY, max_reconnect_delay=MAX_RECONNECT_DELAY):
+        self.source = source
+        self.book = book if book is not None else OrderBook(source.symbol)
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+
+        self.resyncs = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="OrderBookFeed", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _sync(self):
+        # the stream is opened before the snapshot is taken, so no update between the two is lost
+        events = self.source.events()
+        first = next(events)
+        self.book.load_snapshot(self.source.snapshot())
+        self.book.apply_diff(first)
+        return events
+
+    def _run(self):
+        delay = self.reconnect_delay
+        while not self._stop.is_set():
+            try:
+                for event in self._sync():
+                    self.book.apply_diff(event)
+                    delay = self.reconnect_delay
+                    if self._stop.is_set():
+                        return
+                if self.source.finite:
+                    return
+            except OrderBookGap as ex_:
+                print(f"[INFO] from OrderBookFeed: {ex_}, resyncing")
+                self.resyncs += 1
+            except StopIteration:
+                return
+            except Exception as ex_:
+                print(f"[ERROR] from OrderBookFeed: stream dropped ({ex_}), reconnecting in {delay} s")
+
+            self._stop.wait(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+
+def start_order_book(symbol, client=None, source=None):
+    if source is None:
+        if client is None:
+            from binance.client import Client
+            from config import api_key, secret_key
+            client = Client(api_key, secret_key)
+        source = BinanceDepthSource(symbol, client)
+    return OrderBookFeed(source).start()
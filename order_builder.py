@@ -0,0 +1,132 @@
+import math
+from decimal import Decimal, ROUND_DOWN, ROUND_UP, ROUND_HALF_UP
+
+SIDE_BUY = 'BUY'
+SIDE_SELL = 'SELL'
+
+
+def to_decimal(value):
+    return Decimal(str(value))
+
+
+def round_to_step(value, step, rounding=ROUND_HALF_UP):
+    step = to_decimal(step)
+    return ((to_decimal(value) / step).to_integral_value(rounding) * step).quantize(step)
+
+
+def format_decimal(value):
+    return format(value.normalize(), 'f')
+
+
+def filter_step(filters, name, precision_name):
+    if filters.get(name) is not None and to_decimal(filters[name]) > 0:
+        return filters[name]
+    # without the filter fall back to the exchange precision, as the old order code did
+    return str(Decimal(1).scaleb(-int(filters.get(precision_name) or 0)))
+
+
+def common_step(*steps):
+    # the smallest step every given step divides, e.g. 0.001 and 0.01 -> 0.01, 0.002 and 0.005 -> 0.010
+    steps = [to_decimal(step) for step in steps if step is not None and to_decimal(step) > 0]
+    scale = Decimal(1).scaleb(min(step.as_tuple().exponent for step in steps))
+    return math.lcm(*[int(step / scale) for step in steps]) * scale
+
+
+class BracketOrder:
+    def __init__(self, symbol, side, quantity, stop_price, target_price):
+        self.symbol = symbol
+        self.side = side
+        self.close_side = SIDE_SELL if side == SIDE_BUY else SIDE_BUY
+        self.quantity = quantity
+        self.stop_price = stop_price
+        self.target_price = target_price
+
+    def entry_order(self):
+        return {'symbol': self.symbol, 'side': self.side, 'type': 'MARKET', 'quantity': format_decimal(self.quantity)}
+
+    def protective_orders(self):
+        quantity = format_decimal(self.quantity)
+        return [
+            {'symbol': self.symbol, 'side': self.close_side, 'type': 'STOP_MARKET', 'quantity': quantity,
+             'stopPrice': format_decimal(self.stop_price), 'reduceOnly': 'true'},
+            {'symbol': self.symbol, 'side': self.close_side, 'type': 'LIMIT', 'timeInForce': 'GTC',
+             'quantity': quantity, 'price': format_decimal(self.target_price), 'reduceOnly': 'true'}
+        ]
+
+    def close_order(self):
+        return {'symbol': self.symbol, 'side': self.close_side, 'type': 'MARKET',
+                'quantity': format_decimal(self.quantity), 'reduceOnly': 'true'}
+
+    def orders(self):
+        return [self.entry_order()] + self.protective_orders()
+
+
+class OrderBuilder:
+    def __init__(self, filters):
+        self.filters = filters
+        self.tick_size = filter_step(filters, 'tickSize', 'pricePrecision')
+        # one quantity is shared by the MARKET entry (MARKET_LOT_SIZE) and the closing legs (LOT_SIZE)
+        self.step_size = common_step(filter_step(filters, 'marketStepSize', 'quantityPrecision'),
+                                     filters.get('stepSize'))
+
+    def _limit(self, name):
+        value = self.filters.get(name)
+        if value is None or to_decimal(value) <= 0:
+            return None
+        return to_decimal(value)
+
+    def _limits(self, names, pick):
+        values = [value for value in (self._limit(name) for name in names) if value is not None]
+        return pick(values) if values else None
+
+    def price(self, value):
+        price = round_to_step(value, self.tick_size)
+
+        min_price, max_price = self._limit('minPrice'), self._limit('maxPrice')
+        if min_price is not None and price < min_price:
+            price = min_price
+        if max_price is not None and price > max_price:
+            price = max_price
+        return price
+
+    def quantity(self, usd_quantity, price):
+        price = to_decimal(price)
+        quantity = round_to_step(to_decimal(usd_quantity) / price, self.step_size, ROUND_DOWN)
+
+        min_qty = self._limits(['marketMinQty', 'minQty'], max)
+        if min_qty is not None and quantity < min_qty:
+            quantity = round_to_step(min_qty, self.step_size, ROUND_UP)
+
+        min_notional = self._limit('minNotional')
+        if min_notional is not None and quantity * price < min_notional:
+            quantity = round_to_step(min_notional / price, self.step_size, ROUND_UP)
+
+        if quantity <= 0:
+            quantity = to_decimal(self.step_size)
+
+        max_qty = self._limits(['marketMaxQty', 'maxQty'], min)
+        if max_qty is not None and quantity > max_qty:
+            quantity = round_to_step(max_qty, self.step_size, ROUND_DOWN)
+
+        self.validate_quantity(quantity)
+        return quantity
+
+    def validate_quantity(self, quantity):
+        for step_name, min_name, max_name in [('marketStepSize', 'marketMinQty', 'marketMaxQty'),
+                                              ('stepSize', 'minQty', 'maxQty')]:
+            step, min_qty, max_qty = self._limit(step_name), self._limit(min_name), self._limit(max_name)
+            if step is not None and quantity % step != 0:
+                raise ValueError(f"quantity {quantity} is not a multiple of {step_name} {step}")
+            if min_qty is not None and quantity < min_qty:
+                raise ValueError(f"quantity {quantity} is below {min_name} {min_qty}")
+            if max_qty is not None and quantity > max_qty:
+                raise ValueError(f"quantity {quantity} is above {max_name} {max_qty}")
+
+    def bracket(self, symbol, side, price, usd_quantity, stop, target):
+        if side == SIDE_BUY:
+            stop_price, target_price = price * (1 - stop), price * (1 + target)
+        else:
+            stop_price, target_price = price * (1 + stop), price * (1 - target)
+
+        return BracketOrder(symbol, side, self.quantity(usd_quantity, price), self.price(stop_price),
+                            self.price(target_price))
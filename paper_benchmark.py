@@ -0,0 +1,107 @@
+import os
+import io
+import csv
+import time
+import tempfile
+import argparse
+import contextlib
+
+import numpy as np
+from source.paper_exchange import PaperExchange, symbol_filters
+from source.exchange_info import ExchangeMetadataCache
+from source.run_context import RunContext
+
+from source.bot import Bot
+
+DAY_TICKS = 24 * 60
+DECISION_EVERY = 60
+
+
+class ReplayInfo:
+    def __init__(self, course, diff_24h, low_24h, high_24h):
+        self.course = course
+        self.diff_24h = diff_24h
+        self.low_24h = low_24h
+        self.high_24h = high_24h
+
+
+class ReplayAnalysis:
+    # the part of an Analyzer that Bot.prepare_deal reads, computed from the replayed prices
+    def __init__(self, prices):
+        course = prices[-1]
+        day = prices[-DAY_TICKS:]
+        self.info = ReplayInfo(course, course / day[0] - 1, day.min() / course - 1, day.max() / course - 1)
+        self.conclusion = {'expectation': float(np.tanh((course / prices[-DECISION_EVERY:].mean() - 1) * 100))}
+
+
+def load_history(path):
+    history = {}
+    with open(path, mode="r", newline="") as file:
+        for symbol, price, _ in csv.reader(file):
+            history.setdefault(symbol, []).append(float(price))
+    return {symbol: np.array(prices) for symbol, prices in history.items()}
+
+
+def random_history(symbols, ticks, seed=0):
+    generator = np.random.default_rng(seed)
+    return {f"SYM{i}USDT": 100 * np.exp(np.cumsum(generator.normal(0, 0.002, ticks))) for i in range(symbols)}
+
+
+def run_benchmark(history, decision_every=DECISION_EVERY):
+    exchange = PaperExchange({symbol: symbol_filters(tick_size="0.0001", step_size="0.1", min_qty="0.1",
+                                                     max_qty="1000000") for symbol in history})
+    context = RunContext(test_mode=True)
+    exchange_info = ExchangeMetadataCache(exchange, path=os.path.join(os.getcwd(), "paper_exchange_info.json"))
+
+    decision_latency = []
+    order_latency = []
+    ticks = min(len(prices) for prices in history.values())
+
+    time_start = time.perf_counter()
+    for tick in range(ticks):
+        for symbol, prices in history.items():
+            exchange.set_price(symbol, round(prices[tick], 4))
+            context.set_price(symbol, prices[tick])
+
+            if tick < DAY_TICKS or tick % decision_every:
+                continue
+
+            decision_start = time.perf_counter()
+            bot_obj = Bot(symbol, True, context=context, client=exchange, exchange_info=exchange_info,
+                          analyzer_obj=ReplayAnalysis(prices[:tick + 1]))
+            with contextlib.redirect_stdout(io.StringIO()):
+                bot_obj.prepare_deal()
+                order_start = time.perf_counter()
+                bot_obj.come_in_deal()
+            decision_latency.append(order_start - decision_start)
+            order_latency.append(time.perf_counter() - order_start)
+    total_time = time.perf_counter() - time_start
+
+    return {
+        'symbols': len(history),
+        'ticks': ticks,
+        'decisions': len(order_latency),
+        'orders': len(exchange.fills),
+        'decision_ms_p50': 1000 * float(np.percentile(decision_latency, 50)) if decision_latency else None,
+        'order_ms_p50': 1000 * float(np.percentile(order_latency, 50)) if order_latency else None,
+        'order_ms_p95': 1000 * float(np.percentile(order_latency, 95)) if order_latency else None,
+        'order_ms_max': 1000 * float(np.max(order_latency)) if order_latency else None,
+        'decisions_per_second': len(order_latency) / total_time,
+        'ticks_per_second': ticks * len(history) / total_time,
+        'final_balance': float(exchange.balance)
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--history", help="CSV of symbol,price,timestamp rows to replay")
+    parser.add_argument("--symbols", type=int, default=20, help="random-walk symbols when no history is given")
+    parser.add_argument("--ticks", type=int, default=3 * DAY_TICKS)
+    args = parser.parse_args()
+
+    replay = load_history(args.history) if args.history else random_history(args.symbols, args.ticks)
+
+    # the bot writes its report logs into the working directory
+    os.chdir(tempfile.mkdtemp(prefix="paper_benchmark_"))
+    for name, value in run_benchmark(replay).items():
+        print(f"{name}: {value}")
@@ -0,0 +1,192 @@
+import time
+import threading
+import itertools
+from decimal import Decimal
+
+PAPER_BALANCE = 1000
+TAKER_FEE = Decimal("0.0004")
+MAKER_FEE = Decimal("0.0002")
+
+
+class PaperExchangeError(Exception):
+    def __init__(self, code, message):
+        super().__init__(f"APIError(code={code}): {message}")
+        self.code = code
+        self.message = message
+
+
+def symbol_filters(tick_size="0.01", step_size="0.001", min_qty="0.001", max_qty="1000", min_notional="5",
+                   min_price="0.01", max_price="1000000"):
+    return {'tickSize': tick_size, 'stepSize': step_size, 'minQty': min_qty, 'maxQty': max_qty,
+            'minNotional': min_notional, 'minPrice': min_price, 'maxPrice': max_price}
+
+
+def public_order(order):
+    return {key: str(value) if isinstance(value, Decimal) else value for key, value in order.items()}
+
+
+class PaperExchange:
+    def __init__(self, filters, balance=PAPER_BALANCE, taker_fee=TAKER_FEE, maker_fee=MAKER_FEE):
+        self.filters = filters
+        self.balance = Decimal(str(balance))
+        self.taker_fee = taker_fee
+        self.maker_fee = maker_fee
+
+        self.prices = {}
+        self.positions = {}
+        self.open_orders = {}
+        self.fills = []
+
+        self._order_ids = itertools.count(1)
+        self._lock = threading.RLock()
+
+    # client calls used by the bot
+
+    def futures_exchange_info(self):
+        symbols = []
+        for symbol, item in self.filters.items():
+            symbols.append({
+                'symbol': symbol,
+                'quantityPrecision': max(0, -Decimal(item['stepSize']).normalize().as_tuple().exponent),
+                'pricePrecision': max(0, -Decimal(item['tickSize']).normalize().as_tuple().exponent),
+                'filters': [
+                    {'filterType': 'PRICE_FILTER', 'tickSize': item['tickSize'], 'minPrice': item['minPrice'],
+                     'maxPrice': item['maxPrice']},
+                    {'filterType': 'LOT_SIZE', 'stepSize': item['stepSize'], 'minQty': item['minQty'],
+                     'maxQty': item['maxQty']},
+                    {'filterType': 'MARKET_LOT_SIZE', 'stepSize': item['stepSize'], 'minQty': item['minQty'],
+                     'maxQty': item['maxQty']},
+                    {'filterType': 'MIN_NOTIONAL', 'notional': item['minNotional']}
+                ]
+            })
+        return {'symbols': symbols}
+
+    def futures_create_order(self, **params):
+        with self._lock:
+            return self._create_order(params)
+
+    def futures_place_batch_order(self, batchOrders):
+        results = []
+        with self._lock:
+            for params in batchOrders:
+                try:
+                    results.append(self._create_order(params))
+                except PaperExchangeError as ex_:
+                    results.append({'code': ex_.code, 'msg': ex_.message})
+        return results
+
+    def futures_cancel_order(self, symbol, orderId):
+        with self._lock:
+            order = self.open_orders.get(orderId)
+            if order is None or order['symbol'] != symbol:
+                raise PaperExchangeError(-2011, "Unknown order sent.")
+            del self.open_orders[orderId]
+        order['status'] = 'CANCELED'
+        return public_order(order)
+
+    def futures_get_open_orders(self, symbol=None):
+        with self._lock:
+            return [public_order(order) for order in self.open_orders.values()
+                    if symbol is None or order['symbol'] == symbol]
+
+    def futures_position_information(self, symbol=None):
+        with self._lock:
+            return [{'symbol': item, 'positionAmt': str(position['amount']), 'entryPrice': str(position['entry'])}
+                    for item, position in self.positions.items() if symbol is None or item == symbol]
+
+    def futures_account_balance(self):
+        return [{'asset': 'USDT', 'balance': str(self.balance)}]
+
+    def get_account(self):
+        return {'balances': [{'asset': 'USDT', 'free': str(self.balance), 'locked': '0'}]}
+
+    # market simulation
+
+    def set_price(self, symbol, price):
+        with self._lock:
+            self.prices[symbol] = Decimal(str(price))
+            for order in list(self.open_orders.values()):
+                if order['symbol'] == symbol and self._triggered(order, self.prices[symbol]):
+                    del self.open_orders[order['orderId']]
+                    self._fill(order, self.prices[symbol] if order['type'] == 'STOP_MARKET' else order['price'],
+                               self.taker_fee if order['type'] == 'STOP_MARKET' else self.maker_fee)
+
+    @staticmethod
+    def _triggered(order, price):
+        if order['type'] == 'STOP_MARKET':
+            return price <= order['stopPrice'] if order['side'] == 'SELL' else price >= order['stopPrice']
+        return price >= order['price'] if order['side'] == 'SELL' else price <= order['price']
+
+    def _check_step(self, value, step, name):
+        if value % Decimal(step) != 0:
+            raise PaperExchangeError(-1111, f"Precision is over the maximum defined for this asset ({name}).")
+
+    def _create_order(self, params):
+        symbol = params['symbol']
+        if symbol not in self.filters:
+            raise PaperExchangeError(-1121, "Invalid symbol.")
+        if symbol not in self.prices:
+            raise PaperExchangeError(-1008, "No market price for the symbol yet.")
+        item = self.filters[symbol]
+
+        quantity = Decimal(str(params['quantity']))
+        self._check_step(quantity, item['stepSize'], 'quantity')
+        if not Decimal(item['minQty']) <= quantity <= Decimal(item['maxQty']):
+            raise PaperExchangeError(-4003, "Quantity less than or equal to zero or out of the lot size range.")
+
+        order = {
+            'orderId': next(self._order_ids),
+            'symbol': symbol,
+            'side': params['side'],
+            'type': params['type'],
+            'origQty': quantity,
+            'reduceOnly': str(params.get('reduceOnly', 'false')).lower() == 'true',
+            'status': 'NEW',
+            'updateTime': int(time.time() * 1000)
+        }
+
+        for name in ['price', 'stopPrice']:
+            if name in params:
+                order[name] = Decimal(str(params[name]))
+                self._check_step(order[name], item['tickSize'], name)
+
+        reference = order.get('price', order.get('stopPrice', self.prices[symbol]))
+        if not order['reduceOnly'] and quantity * reference < Decimal(item['minNotional']):
+            raise PaperExchangeError(-4164, f"Order's notional must be no smaller than {item['minNotional']}.")
+
+        if order['type'] == 'MARKET':
+            self._fill(order, self.prices[symbol], self.taker_fee)
+        elif order['type'] in ('LIMIT', 'STOP_MARKET'):
+            self.open_orders[order['orderId']] = order
+            self.set_price(symbol, self.prices[symbol])
+        else:
+            raise PaperExchangeError(-1116, "Invalid orderType.")
+        return public_order(order)
+
+    def _fill(self, order, price, fee_rate):
+        position = self.positions.setdefault(order['symbol'], {'amount': Decimal(0), 'entry': Decimal(0)})
+        amount = position['amount']
+        delta = order['origQty'] if order['side'] == 'BUY' else -order['origQty']
+
+        if order['reduceOnly']:
+            if amount == 0 or (amount > 0) == (delta > 0):
+                order['status'] = 'EXPIRED'
+                return
+            delta = max(-abs(amount), min(abs(amount), delta))
+
+        if amount != 0 and (amount > 0) != (delta > 0):
+            closed = min(abs(amount), abs(delta))
+            self.balance += closed * (price - position['entry']) * (1 if amount > 0 else -1)
+            if abs(delta) > abs(amount):
+                position['entry'] = price
+        else:
+            position['entry'] = (abs(amount) * position['entry'] + abs(delta) * price) / (abs(amount) + abs(delta))
+
+        position['amount'] = amount + delta
+        if position['amount'] == 0:
+            position['entry'] = Decimal(0)
+
+        self.balance -= abs(delta) * price * fee_rate
+        order['status'] = 'FILLED'
+        order['avgPrice'] = price
+        self.fills.append(dict(order))
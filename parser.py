@@ -1,35 +1,25 @@
-from source.scraper import Scraper
-from source.analyzer import Analyzer
+from source.sample_store import SampleStore
+from source.collection_pipeline import CollectionPipeline
+from source.datafile_updater import DatafileUpdater
 from config import SYMBOLS
 
 
 def collect_data(test_mode=True):
-    scraper_obj = Scraper(print_opt=False, test_mode=test_mode)
-    scraper_obj.parse_common()
+    pipeline = CollectionPipeline(SYMBOLS, test_mode=test_mode)
+    try:
+        pipeline.run()
+    finally:
+        pipeline.close()
 
-    for s in SYMBOLS:
-        print("-" * 30, s, "-" * 30)
-        scraper_obj.set_symbol(s)
-        scraper_obj.parse_coin_data()
-
-        info = scraper_obj.info
-        print(f"(finished scraping)")
-
-        analyzer_obj = Analyzer(info, test_mode=test_mode)
-        analyzer_obj.analyse()
-        analyzer_obj.serialize()
-        print(f"(finished analysis)")
-        print("-" * 61, "\n")
+    SampleStore(test_mode=test_mode).rebuild()
 
 
 def update_datafiles(test_mode=True):
-    scraper_obj = Scraper(print_opt=False, test_mode=test_mode)
-    analyzer_obj = Analyzer(info=scraper_obj.info, test_mode=test_mode)
-
-    data = analyzer_obj.deserialize()
-    for item in data:
-        analyzer_obj.update_datafile(item, scraper_obj)
+    store = SampleStore(test_mode=test_mode)
+    if DatafileUpdater(test_mode=test_mode, store=store).run():
+        store.rebuild()
 
 
-collect_data(test_mode=False)
-update_datafiles(test_mode=False)
+if __name__ == '__main__':
+    collect_data(test_mode=False)
+    update_datafiles(test_mode=False)
@@ -0,0 +1,30 @@
+import numpy as np
+
+PREDICTION_DTYPE = np.dtype([
+    ('total', 'float64'),
+    ('min', 'float64'),
+    ('max', 'float64'),
+    ('first_extremum', 'float64'),
+    ('normal', 'bool')
+])
+
+
+def order_predictions(raw):
+    raw = np.asarray(raw, dtype='float64').reshape(-1, 4)
+
+    # a normal output already is (total, min, max) with min < total < max
+    normal = (raw[:, 2] > raw[:, 0]) & (raw[:, 0] > raw[:, 1])
+    ordered = np.sort(raw[:, :3], axis=1)
+
+    result = np.empty(len(raw), dtype=PREDICTION_DTYPE)
+    result['total'] = np.where(normal, raw[:, 0], ordered[:, 1])
+    result['min'] = np.where(normal, raw[:, 1], ordered[:, 0])
+    result['max'] = np.where(normal, raw[:, 2], ordered[:, 2])
+    result['first_extremum'] = raw[:, 3]
+    result['normal'] = normal
+    return result
+
+
+def prediction_values(predictions):
+    return np.stack([predictions['total'], predictions['min'], predictions['max'], predictions['first_extremum']],
+                    axis=-1)
@@ -0,0 +1,129 @@
+import csv
+import json
+import time
+import threading
+
+FUTURES_STREAM_URL = "wss://fstream.binance.com/stream?streams="
+RECONNECT_DELAY = 1
+MAX_RECONNECT_DELAY = 60
+RECEIVE_TIMEOUT = 30
+
+
+class PriceTable:
+    def __init__(self):
+        self._prices = {}
+        self._lock = threading.Lock()
+        self._updated = threading.Condition(self._lock)
+
+    def update(self, symbol, price, event_time=None):
+        with self._updated:
+            self._prices[symbol] = (price, event_time if event_time is not None else time.time(), time.monotonic())
+            self._updated.notify_all()
+
+    def get(self, symbol, max_age=None):
+        with self._lock:
+            item = self._prices.get(symbol)
+        if item is None or (max_age is not None and time.monotonic() - item[2] > max_age):
+            return None
+        return item[0]
+
+    def snapshot(self):
+        with self._lock:
+            return {symbol: item[0] for symbol, item in self._prices.items()}
+
+    def wait_for(self, symbols, timeout=None):
+        with self._updated:
+            return self._updated.wait_for(lambda: all(symbol in self._prices for symbol in symbols), timeout)
+
+
+class BinanceStreamSource:
+    finite = False
+
+    def __init__(self, symbols, url=FUTURES_STREAM_URL, timeout=RECEIVE_TIMEOUT):
+        self.url = url + "/".join(f"{symbol.lower()}@miniTicker" for symbol in symbols)
+        self.timeout = timeout
+
+    def events(self):
+        import websocket
+
+        connection = websocket.create_connection(self.url, timeout=self.timeout)
+        try:
+            while True:
+                data = json.loads(connection.recv())['data']
+                yield data['s'], float(data['c']), data['E'] / 1000
+        finally:
+            connection.close()
+
+
+class ReplaySource:
+    finite = True
+
+    def __init__(self, events=None, path=None, speed=None):
+        # events are (symbol, price, timestamp); speed=None replays without waiting, 1.0 in real time
+        if path is not None:
+            with open(path, mode="r", newline="") as file:
+                events = [(row[0], float(row[1]), float(row[2])) for row in csv.reader(file)]
+        self.replay_events = list(events or [])
+        self.speed = speed
+
+    def events(self):
+        previous = None
+        for symbol, price, timestamp in self.replay_events:
+            if self.speed is not None and previous is not None and timestamp > previous:
+                time.sleep((timestamp - previous) / self.speed)
+            previous = timestamp
+            yield symbol, price, timestamp
+
+
+class PriceFeed:
+    def __init__(self, source, table=None, reconnect_delay=RECONNECT_DELAY, max_reconnect_delay=MAX_RECONNECT_DELAY):
+        self.source = source
+        self.table = table if table is not None else PriceTable()
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+
+        self.reconnects = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="PriceFeed", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        delay = self.reconnect_delay
+        while not self._stop.is_set():
+            try:
+                for symbol, price, event_time in self.source.events():
+                    self.table.update(symbol, price, event_time)
+                    delay = self.reconnect_delay
+                    if self._stop.is_set():
+                        return
+                if self.source.finite:
+                    return
+            except Exception as ex_:
+                print(f"[ERROR] from PriceFeed: stream dropped ({ex_}), reconnecting in {delay} s")
+
+            self.reconnects += 1
+            self._stop.wait(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def price(self, symbol, max_age=None):
+        return self.table.get(symbol, max_age)
+
+
+def start_price_feed(symbols, context=None, source=None):
+    feed = PriceFeed(source if source is not None else BinanceStreamSource(symbols)).start()
+    if context is not None:
+        context.attach_feed(feed)
+    return feed
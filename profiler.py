@@ -0,0 +1,130 @@
+import os
+import json
+import time
+import datetime
+import resource
+import threading
+import contextlib
+
+PROFILE_REPORT_PATH = "profile_reports.jsonl"
+REGRESSION_TOLERANCE = 0.2
+
+
+class Profiler:
+    def __init__(self, name="run"):
+        self.name = name
+        self.phases = {}
+        self.samples_per_second = []
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            with self._lock:
+                item = self.phases.setdefault(name, {'calls': 0, 'wall': 0.0, 'cpu': 0.0})
+                item['calls'] += 1
+                item['wall'] += wall
+                item['cpu'] += cpu
+
+    def epoch_callback(self, samples):
+        from source.import_file import keras
+
+        profiler = self
+
+        class EpochTimer(keras.callbacks.Callback):
+            def __init__(self):
+                super().__init__()
+                self.epoch_start = None
+
+            def on_epoch_begin(self, epoch, logs=None):
+                self.epoch_start = time.perf_counter()
+
+            def on_epoch_end(self, epoch, logs=None):
+                profiler.samples_per_second.append(samples / (time.perf_counter() - self.epoch_start))
+
+        return EpochTimer()
+
+    @staticmethod
+    def peak_rss_mb():
+        # ru_maxrss is in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    def record(self):
+        epochs = {'count': len(self.samples_per_second)}
+        if self.samples_per_second:
+            epochs['mean_samples_per_second'] = sum(self.samples_per_second) / len(self.samples_per_second)
+            epochs['min_samples_per_second'] = min(self.samples_per_second)
+
+        return {
+            'name': self.name,
+            'date_time': datetime.datetime.now().isoformat(timespec='seconds'),
+            'phases': self.phases,
+            'epochs': epochs,
+            'peak_rss_mb': self.peak_rss_mb()
+        }
+
+    def write(self, path=PROFILE_REPORT_PATH):
+        record = self.record()
+        with open(path, mode="a") as file:
+            file.write(json.dumps(record) + "\n")
+        return record
+
+
+def load_records(path=PROFILE_REPORT_PATH, name=None):
+    if not os.path.exists(path):
+        return []
+    with open(path, mode="r") as file:
+        records = [json.loads(line) for line in file if line.strip()]
+    if name is not None:
+        records = [item for item in records if item['name'] == name]
+    return records
+
+
+def compare(previous, current, tolerance=REGRESSION_TOLERANCE):
+    regressions = []
+
+    for name, item in current['phases'].items():
+        before = previous['phases'].get(name)
+        if before is None or before['wall'] == 0:
+            continue
+        if item['wall'] > before['wall'] * (1 + tolerance):
+            regressions.append(f"{name}: wall time {before['wall']:.2f} s -> {item['wall']:.2f} s")
+
+    before_speed = previous['epochs'].get('mean_samples_per_second')
+    speed = current['epochs'].get('mean_samples_per_second')
+    if before_speed and speed and speed < before_speed * (1 - tolerance):
+        regressions.append(f"training speed: {before_speed:.1f} -> {speed:.1f} samples/s")
+
+    if current['peak_rss_mb'] > previous['peak_rss_mb'] * (1 + tolerance):
+        regressions.append(f"peak RSS: {previous['peak_rss_mb']:.0f} MB -> {current['peak_rss_mb']:.0f} MB")
+
+    return regressions
+
+
+_profiler = Profiler()
+
+
+def get_profiler():
+    return _profiler
+
+
+def reset_profiler(name="run"):
+    global _profiler
+    _profiler = Profiler(name)
+    return _profiler
+
+
+if __name__ == '__main__':
+    last_records = load_records()[-2:]
+    if len(last_records) < 2:
+        print("not enough profile records to compare")
+    else:
+        found = compare(*last_records)
+        for line in found or ["no regressions"]:
+            print(line)
@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import struct
+import datetime
+
+from source.sample_store import file_lock
+from config import current_symbol
+
+PREDICTION_LOG_PATH = "prediction_reports.log"
+DEAL_LOG_PATH = "deal_reports.log"
+# the text reports model.py wrote before the binary log, one "signal;epochs;limitation;date" line each
+LEGACY_PREDICTION_PATH = "prediction_reports.txt"
+LEGACY_TIME_FRAME = 'Difference_1D'
+LEGACY_DATE_FORMATS = ["%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%d.%m.%Y %H:%M:%S", "%d.%m.%Y %H:%M", "%Y-%m-%d"]
+
+MAX_LOG_BYTES = 8 * 1024 * 1024
+LOG_BACKUPS = 5
+
+# every layout starts with the record timestamp, which keeps the log sorted by time
+PREDICTION_LAYOUT = [('timestamp', 'd'), ('symbol', '16s'), ('time_frame', '16s'), ('prediction', 'd'),
+                     ('strength', 'i'), ('epochs', 'i'), ('limitation', 'i')]
+DEAL_LAYOUT = [('timestamp', 'd'), ('symbol', '16s'), ('side', '8s'), ('quantity', 'd'), ('stop_price', 'd'),
+               ('target_price', 'd'), ('price', 'd')]
+
+
+def latest_key(symbol, time_frame=None):
+    # predictions of one symbol differ per time frame, deals have none
+    if time_frame is None:
+        return symbol
+    return f"{symbol}|{time_frame}"
+
+
+class ReportLog:
+    def __init__(self, path, layout, max_bytes=MAX_LOG_BYTES, backups=LOG_BACKUPS):
+        self.path = path
+        self.fields = [name for name, _ in layout]
+        self.text_fields = {name: struct.calcsize(fmt) for name, fmt in layout if fmt.endswith('s')}
+        self.record = struct.Struct("<" + "".join(fmt for _, fmt in layout))
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.latest_path = path + ".latest.json"
+        # the trainer, the bots and the daemon append from separate processes
+        self.lock_path = path + ".lock"
+
+    def _pack(self, values):
+        values = dict(values)
+        values.setdefault('timestamp', time.time())
+        for name, size in self.text_fields.items():
+            values[name] = str(values.get(name, "")).encode()
+            # struct would silently cut the value, and latest() would then never find it
+            if len(values[name]) > size:
+                raise ValueError(f"{name} {values[name].decode()!r} is longer than the {size} bytes of the layout")
+        return self.record.pack(*[values[name] for name in self.fields])
+
+    def _unpack(self, data):
+        values = dict(zip(self.fields, self.record.unpack(data)))
+        for name in self.text_fields:
+            values[name] = values[name].rstrip(b"\0").decode()
+        return values
+
+    def append(self, **values):
+        data = self._pack(values)
+
+        with file_lock(self.lock_path):
+            if os.path.exists(self.path) and os.path.getsize(self.path) + len(data) > self.max_bytes:
+                self._rotate()
+
+            with open(self.path, mode="ab") as file:
+                file.write(data)
+
+            record = self._unpack(data)
+            if 'symbol' in record:
+                latest = self._read_latest()
+                latest[latest_key(record['symbol'], record.get('time_frame'))] = record
+                tmp_path = f"{self.latest_path}.{os.getpid()}.tmp"
+                with open(tmp_path, mode="w") as file:
+                    json.dump(latest, file)
+                os.replace(tmp_path, self.latest_path)
+
+        return record
+
+    def _rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def _read_latest(self):
+        if not os.path.exists(self.latest_path):
+            return {}
+        with open(self.latest_path, mode="r") as file:
+            return json.load(file)
+
+    def latest(self, symbol, time_frame=None):
+        return self._read_latest().get(latest_key(symbol, time_frame))
+
+    def _files(self):
+        backups = [f"{self.path}.{i}" for i in range(self.backups, 0, -1)]
+        return [path for path in backups + [self.path] if os.path.exists(path)]
+
+    def _length(self, path):
+        return os.path.getsize(path) // self.record.size
+
+    def __len__(self):
+        return sum(self._length(path) for path in self._files())
+
+    def _read(self, file, index, count=1):
+        file.seek(index * self.record.size)
+        data = file.read(count * self.record.size)
+        return [self._unpack(data[i:i + self.record.size]) for i in range(0, len(data), self.record.size)]
+
+    def tail(self, count=1):
+        records = []
+        for path in reversed(self._files()):
+            length = self._length(path)
+            needed = count - len(records)
+            with open(path, mode="rb") as file:
+                records = self._read(file, max(0, length - needed), min(length, needed)) + records
+            if len(records) >= count:
+                break
+        return records
+
+    def _bisect(self, file, length, timestamp):
+        low, high = 0, length
+        while low < high:
+            middle = (low + high) // 2
+            if self._read(file, middle)[0]['timestamp'] < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def between(self, start, end):
+        records = []
+        for path in self._files():
+            length = self._length(path)
+            if length == 0:
+                continue
+            with open(path, mode="rb") as file:
+                if self._read(file, length - 1)[0]['timestamp'] < start:
+                    continue
+                first = self._bisect(file, length, start)
+                last = self._bisect(file, length, end)
+                records += self._read(file, first, last - first)
+        return records
+
+
+def parse_legacy_date(value):
+    for date_format in LEGACY_DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(value.strip(), date_format).timestamp()
+        except ValueError:
+            continue
+    return None
+
+
+def migrate_legacy_predictions(log, path=LEGACY_PREDICTION_PATH, symbol=current_symbol, time_frame=LEGACY_TIME_FRAME):
+    # the old reports carry no symbol, they were all written for current_symbol
+    if not os.path.exists(path) or os.path.exists(log.path):
+        return 0
+
+    lines = []
+    with open(path, mode="r") as file:
+        for line in file:
+            parts = line.strip().split(';')
+            if len(parts) >= 3:
+                lines.append(parts)
+
+    # a date that doesn't parse reuses the previous timestamp, and none goes back in time, so the log stays sorted
+    timestamp = None
+    for parts in lines:
+        parsed = parse_legacy_date(parts[3]) if len(parts) > 3 else None
+        if parsed is None:
+            parsed = timestamp if timestamp is not None else os.path.getmtime(path)
+        timestamp = parsed if timestamp is None else max(timestamp, parsed)
+        log.append(timestamp=timestamp, symbol=symbol, time_frame=time_frame, prediction=float(parts[0]), strength=0,
+                   epochs=int(parts[1]), limitation=int(parts[2]))
+    return len(lines)
+
+
+def prediction_log(path=PREDICTION_LOG_PATH):
+    log = ReportLog(path, PREDICTION_LAYOUT)
+    migrate_legacy_predictions(log)
+    return log
+
+
+def deal_log(path=DEAL_LOG_PATH):
+    return ReportLog(path, DEAL_LAYOUT)
+
+
+if __name__ == '__main__':
+    for log in [prediction_log(), deal_log()]:
+        print(f"{log.path} ({len(log)} records):")
+        for item in log.tail(20):
+            print(";".join(str(item[name]) for name in log.fields))
+        print()
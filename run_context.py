@@ -0,0 +1,105 @@
+import time
+import threading
+
+from source.analyzer import Analyzer
+from source.scraper import Scraper
+from source.sample_store import SampleStore
+from source.profiler import get_profiler
+
+RECORDS_TTL = 3600
+CONCLUSION_TTL = 3600
+PRICE_TTL = 15
+
+
+class TTLCache:
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, ttl):
+        with self._lock:
+            item = self._values.get(key)
+        if item is None or time.monotonic() - item[1] > ttl:
+            return None
+        return item[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._values[key] = (value, time.monotonic())
+
+    def get_or_load(self, key, loader, ttl):
+        value = self.get(key, ttl)
+        if value is None:
+            value = loader()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._values.clear()
+            else:
+                self._values.pop(key, None)
+
+
+class RunContext:
+    def __init__(self, test_mode=False, records_ttl=RECORDS_TTL, conclusion_ttl=CONCLUSION_TTL, price_ttl=PRICE_TTL):
+        self.test_mode = test_mode
+        self.records_ttl = records_ttl
+        self.conclusion_ttl = conclusion_ttl
+        self.price_ttl = price_ttl
+
+        self.cache = TTLCache()
+        self.store = SampleStore(test_mode=test_mode)
+        self.feed = None
+        self._scraper_obj = None
+
+    def attach_feed(self, feed):
+        self.feed = feed
+
+    def records(self):
+        return self.cache.get_or_load('records', self._deserialize, self.records_ttl)
+
+    def _deserialize(self):
+        with get_profiler().phase("deserialize"):
+            return Analyzer(test_mode=self.test_mode).deserialize()
+
+    def sample_store(self):
+        if not self.store.exists():
+            # the datafiles changed, so the cached records and conclusions are stale too
+            self.cache.invalidate('records')
+            self.store.rebuild(records=self.records(), force=False)
+        return self.store
+
+    def last_conclusion(self, ticker):
+        partition = self.sample_store().partition(ticker)
+        return self.cache.get_or_load(('conclusion', ticker, partition.fingerprint()), partition.last_conclusion,
+                                      self.conclusion_ttl)
+
+    def set_price(self, symbol, price):
+        self.cache.set(('price', symbol), price)
+
+    def price(self, symbol):
+        if self.feed is not None:
+            price = self.feed.price(symbol, max_age=self.price_ttl)
+            if price is not None:
+                return price
+        return self.cache.get_or_load(('price', symbol), lambda: self._scrape_price(symbol), self.price_ttl)
+
+    def _scrape_price(self, symbol):
+        if self._scraper_obj is None:
+            self._scraper_obj = Scraper(test_mode=self.test_mode)
+        with get_profiler().phase("parse course"):
+            self._scraper_obj.parse_course(symbol=symbol)
+        return self._scraper_obj.info.course
+
+
+_contexts = {}
+_contexts_lock = threading.Lock()
+
+
+def get_context(test_mode=False):
+    with _contexts_lock:
+        if test_mode not in _contexts:
+            _contexts[test_mode] = RunContext(test_mode=test_mode)
+        return _contexts[test_mode]
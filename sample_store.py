@@ -0,0 +1,274 @@
+import os
+import glob
+import json
+import time
+import hashlib
+import shutil
+import contextlib
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+from source.signals import SIGNAL_FIELDS
+from source.profiler import get_profiler
+import config
+
+SAMPLE_STORE_PATH = "sample_store/"
+STORE_VERSION = 3
+GENERATIONS_KEPT = 2
+# where Analyzer.serialize keeps the datafiles, watched so outside changes trigger a rebuild
+DATAFILE_PATH = getattr(config, "datafile_repository_path", None)
+SIGNATURE_CHECK_INTERVAL = 5
+INPUT_COLUMNS = {'base': "Model_input_base", 'full': "Model_input_full"}
+
+
+def datafile_key(datafile_index):
+    test = 0
+    if 'test' in datafile_index:
+        test = 1
+    dfx = datafile_index.split('.')
+    return int(dfx[0 + test]) * 365 + int(dfx[1 + test])
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    with open(path, mode="a+") as file:
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        else:
+            file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def datafile_signature(path=DATAFILE_PATH):
+    # without the directory every signature would be empty and datafile changes would go unnoticed
+    if path is None or not os.path.isdir(path):
+        raise FileNotFoundError(f"datafile directory {path!r} not found, set config.datafile_repository_path "
+                                f"to the directory Analyzer.serialize writes to")
+
+    signature = []
+    for name in sorted(glob.glob(os.path.join(path, "**", "*"), recursive=True)):
+        if os.path.isfile(name):
+            stat = os.stat(name)
+            signature.append([os.path.relpath(name, path), stat.st_mtime_ns, stat.st_size])
+    return signature
+
+
+def input_column(mode):
+    if mode == 'base':
+        return INPUT_COLUMNS['base']
+    return INPUT_COLUMNS['full']
+
+
+class TickerPartition:
+    def __init__(self, path):
+        self.path = path
+
+        with open(os.path.join(path, "meta.json"), mode="r") as file:
+            self.meta = json.load(file)
+
+        self.time_frames = self.meta['time_frames']
+        self.keys = np.load(os.path.join(path, "keys.npy"), mmap_mode='r')
+        self._columns = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def column(self, name):
+        if name not in self._columns:
+            self._columns[name] = np.load(os.path.join(self.path, name + ".npy"), mmap_mode='r')
+        return self._columns[name]
+
+    def inputs(self, mode):
+        return self.column(input_column(mode))
+
+    def conclusions(self):
+        return self.column("Conclusion")
+
+    def result(self, time_frame):
+        return self.column("Result")[:, self.time_frames.index(time_frame)]
+
+    def last_conclusion(self):
+        return self.meta['last_conclusion']
+
+    def fingerprint(self):
+        return self.meta['fingerprint']
+
+
+class SampleStore:
+    def __init__(self, test_mode=False, path=SAMPLE_STORE_PATH, datafile_path=None):
+        self.test_mode = test_mode
+        self.root = os.path.join(path, "test" if test_mode else "main")
+        self.datafile_path = datafile_path if datafile_path is not None else DATAFILE_PATH
+
+        # the generation directory in use; rebuilds write a new one and switch current.json over to it
+        self.path = None
+        self._generation = None
+        self._tickers = []
+        self._partitions = {}
+        self._checked = None
+
+    def _current(self):
+        try:
+            with open(os.path.join(self.root, "current.json"), mode="r") as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _use(self, current):
+        if current['generation'] != self._generation:
+            self._generation = current['generation']
+            self.path = os.path.join(self.root, self._generation)
+            self._partitions = {}
+        self._tickers = current['tickers']
+
+    def exists(self):
+        # the datafiles are listed at most every few seconds, partition() calls this on every lookup
+        if self._checked is not None and time.monotonic() - self._checked < SIGNATURE_CHECK_INTERVAL:
+            return True
+
+        current = self._current()
+        if current is None or current.get('version') != STORE_VERSION:
+            return False
+        if current['signature'] != datafile_signature(self.datafile_path):
+            return False
+
+        self._use(current)
+        self._checked = time.monotonic()
+        return True
+
+    def tickers(self):
+        if not self.exists():
+            self.rebuild(force=False)
+        return self._tickers
+
+    def partition(self, ticker):
+        # tickers() rebuilds first when the datafiles changed, which drops the cached partitions
+        tickers = self.tickers()
+        if ticker not in self._partitions:
+            if ticker not in tickers:
+                raise KeyError(f"no samples stored for ticker {ticker}")
+            self._partitions[ticker] = TickerPartition(os.path.join(self.path, ticker))
+        return self._partitions[ticker]
+
+    def rebuild(self, records=None, force=True):
+        os.makedirs(self.root, exist_ok=True)
+
+        # one rebuild at a time across processes; the ones that waited find the store fresh and skip theirs
+        with file_lock(os.path.join(self.root, "rebuild.lock")):
+            self._checked = None
+            if not force and self.exists():
+                return
+
+            # taken before reading, so datafiles written during the rebuild trigger the next one
+            signature = datafile_signature(self.datafile_path)
+            if records is None:
+                # imported here so readers of the store, like the live NumPy inference, never load the analyzer
+                from source.analyzer import Analyzer
+
+                with get_profiler().phase("deserialize"):
+                    records = Analyzer(test_mode=self.test_mode).deserialize()
+
+            grouped = {}
+            for item in records:
+                grouped.setdefault(item['Information']['Ticker'], []).append(item)
+
+            generation = f"gen-{time.time_ns()}-{os.getpid()}"
+            tmp_path = os.path.join(self.root, "." + generation + ".tmp")
+            os.makedirs(tmp_path)
+            for ticker, items in grouped.items():
+                self._write_partition(os.path.join(tmp_path, ticker), items)
+            os.replace(tmp_path, os.path.join(self.root, generation))
+
+            current = {'version': STORE_VERSION, 'generation': generation, 'tickers': sorted(grouped),
+                       'signature': signature}
+            tmp_file = os.path.join(self.root, f".current.{os.getpid()}.tmp")
+            with open(tmp_file, mode="w") as file:
+                json.dump(current, file)
+            # readers switch to the new generation in one step, they never see a half-written store
+            os.replace(tmp_file, os.path.join(self.root, "current.json"))
+
+            self._use(current)
+            self._checked = time.monotonic()
+            self._prune()
+
+    def _prune(self):
+        # the previous generation stays for readers that loaded it just before the switch
+        generations = sorted(name for name in os.listdir(self.root) if name.startswith("gen-"))
+        keep = set(generations[-GENERATIONS_KEPT:]) | {"current.json", "rebuild.lock"}
+        for name in os.listdir(self.root):
+            if name in keep:
+                continue
+            item = os.path.join(self.root, name)
+            if os.path.isdir(item):
+                shutil.rmtree(item, ignore_errors=True)
+            else:
+                try:
+                    os.remove(item)
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _write_partition(path, items):
+        os.makedirs(path)
+
+        keys = np.array([datafile_key(item['Information']['Datafile_index']) for item in items])
+
+        # a stable sort keeps the first record of a duplicated datafile index
+        order = np.argsort(keys, kind='stable')
+        keys, first = np.unique(keys[order], return_index=True)
+        items = [items[i] for i in order[first]]
+
+        time_frames = []
+        width = 0
+        for item in items:
+            for time_frame, value in item['Result'].items():
+                if time_frame not in time_frames:
+                    time_frames.append(time_frame)
+                if value is not None:
+                    width = max(width, len(value))
+
+        result = np.full((len(items), len(time_frames), max(width, 1)), np.nan)
+        for i, item in enumerate(items):
+            for time_frame, value in item['Result'].items():
+                if value is not None:
+                    result[i, time_frames.index(time_frame)] = value
+
+        # the get_signal indicators of every record, NaN where a record lacks one
+        conclusions = np.array([[item['Conclusion'].get(field, np.nan) for field in SIGNAL_FIELDS] for item in items],
+                               dtype='float64')
+
+        columns = {"keys": keys, "Result": result, "Conclusion": conclusions}
+        for column in INPUT_COLUMNS.values():
+            columns[column] = np.array([item[column] for item in items], dtype='float64')
+
+        digest = hashlib.sha1(json.dumps(time_frames).encode())
+        for name, values in columns.items():
+            np.save(os.path.join(path, name + ".npy"), values)
+            digest.update(np.ascontiguousarray(values).tobytes())
+
+        meta = {
+            'fingerprint': digest.hexdigest(),
+            'time_frames': time_frames,
+            'datafile_indexes': [item['Information']['Datafile_index'] for item in items],
+            'last_conclusion': items[-1]['Conclusion']
+        }
+        with open(os.path.join(path, "meta.json"), mode="w") as file:
+            json.dump(meta, file, default=float)
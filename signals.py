@@ -0,0 +1,54 @@
+import numpy as np
+
+SIGNAL_FIELDS = ['RSI', 'CCI20', 'Stoch.K', 'Mom', 'MACD.macd', 'P.SAR', 'HullMA9', 'BB.upper', 'BB.lower',
+                 'Ichimoku.BLine', 'expectation', 'tw_summary']
+
+CONFIRMED_STRENGTH = 3
+LITTLE_CONFIRMED_STRENGTH = 2
+CONFIRMED_PREDICTION = 0.03
+
+# (confirms a negative prediction, confirms a positive prediction)
+CONFIRMATION_RULES = [
+    (lambda c: (c['RSI'] > 60) & (c['CCI20'] > 90), lambda c: (c['RSI'] < 40) & (c['CCI20'] < -90)),
+    (lambda c: (c['RSI'] > 60) & (c['Stoch.K'] > 70), lambda c: (c['RSI'] < 40) & (c['Stoch.K'] < 30)),
+    (lambda c: (c['Mom'] > 0) & (c['MACD.macd'] > 0), lambda c: (c['Mom'] < 0) & (c['MACD.macd'] < 0)),
+    (lambda c: (c['P.SAR'] > 1) & (c['HullMA9'] > 1), lambda c: (c['P.SAR'] < 1) & (c['HullMA9'] < 1)),
+    (lambda c: (c['BB.upper'] > 1) & (c['Ichimoku.BLine'] > 1),
+     lambda c: (c['BB.lower'] < 1) & (c['Ichimoku.BLine'] < 1)),
+    (lambda c: c['expectation'] < 0, lambda c: c['expectation'] > 0),
+    (lambda c: c['tw_summary'] < 0, lambda c: c['tw_summary'] > 0)
+]
+
+
+def signal_strength(total, conclusion):
+    total = np.asarray(total, dtype='float64')
+    conclusion = {field: np.asarray(conclusion[field], dtype='float64') for field in SIGNAL_FIELDS}
+
+    positive = total > 0
+    strength = np.where(positive, 1, -1)
+
+    # a rule only strengthens a signal with the same sign, so the sign never flips
+    for negative_rule, positive_rule in CONFIRMATION_RULES:
+        strength = strength - (~positive & negative_rule(conclusion)) + (positive & positive_rule(conclusion))
+
+    return strength
+
+
+def signal_position(strength, total, min_strength=CONFIRMED_STRENGTH, min_prediction=CONFIRMED_PREDICTION):
+    strength, total = np.asarray(strength), np.asarray(total)
+    long = (strength >= min_strength) & (total > min_prediction)
+    short = (strength <= -min_strength) & (total < -min_prediction)
+    return long.astype(int) - short.astype(int)
+
+
+def signal_label(strength, total):
+    if strength >= CONFIRMED_STRENGTH and total > CONFIRMED_PREDICTION:
+        return "confirmed signal (POSITIVE)"
+    elif strength <= -CONFIRMED_STRENGTH and total < -CONFIRMED_PREDICTION:
+        return "confirmed signal (NEGATIVE)"
+    elif strength >= LITTLE_CONFIRMED_STRENGTH:
+        return "little confirmed signal (POSITIVE)"
+    elif strength <= -LITTLE_CONFIRMED_STRENGTH:
+        return "little confirmed signal (NEGATIVE)"
+    else:
+        return "too weak signal (or signal didn't confirm)"
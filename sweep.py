@@ -0,0 +1,96 @@
+import os
+import csv
+import time
+import resource
+import itertools
+from concurrent.futures import as_completed
+
+from source.dataset_builder import DatasetBuilder
+from source.training_driver import create_pool, THREADS_PER_WORKER
+from config import current_symbol
+
+MODEL_STRUCTS = [1, 2, 3, 4, 5]
+LIMITATIONS = [30, 60]
+EPOCHS_GRID = [500, 1500, 4500]
+
+VALIDATION_SPLIT = 0.2
+MAPE_TOLERANCE = 0.05
+SWEEP_RESULTS_PATH = "sweep_results.csv"
+
+RESULT_FIELDS = ['ticker', 'time_frame', 'model_struct', 'limitation', 'epochs', 'val_mape', 'wall_time',
+                 'peak_memory_mb']
+
+
+def evaluate(ticker, time_frame, model_struct, limitation, epochs, test_mode=False):
+    from source.neural_network import NeuralNetwork
+
+    time_start = time.perf_counter()
+
+    model = NeuralNetwork(ticker=ticker, mode="full", model_struct=model_struct, time_frame=time_frame,
+                          limitation_ps=1, limitation_pr=limitation, test_mode=test_mode)
+    val_mape = model.fit(epochs, validation_split=VALIDATION_SPLIT)
+
+    return {
+        'ticker': ticker,
+        'time_frame': time_frame,
+        'model_struct': model_struct,
+        'limitation': limitation,
+        'epochs': epochs,
+        'val_mape': float(val_mape),
+        'wall_time': time.perf_counter() - time_start,
+        # ru_maxrss is in kilobytes on Linux; every configuration gets a fresh worker process
+        'peak_memory_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }
+
+
+def write_results(results, path=SWEEP_RESULTS_PATH):
+    new_file = not os.path.exists(path)
+    with open(path, mode="a", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=RESULT_FIELDS)
+        if new_file:
+            writer.writeheader()
+        writer.writerows(results)
+
+
+def cheapest_best(results, tolerance=MAPE_TOLERANCE):
+    best = min(item['val_mape'] for item in results)
+    matching = [item for item in results if item['val_mape'] <= best * (1 + tolerance)]
+    return min(matching, key=lambda item: item['wall_time'])
+
+
+def run_sweep(ticker, model_structs=MODEL_STRUCTS, limitations=LIMITATIONS, epochs_grid=EPOCHS_GRID,
+              time_frames=None, test_mode=False, workers=None, threads=THREADS_PER_WORKER):
+    # the workers load this cached dataset instead of each one building it
+    dataset = DatasetBuilder(test_mode=test_mode).build(ticker)
+    if time_frames is None:
+        time_frames = dataset.time_frames
+
+    grid = list(itertools.product(time_frames, model_structs, limitations, epochs_grid))
+
+    results = []
+    with create_pool(workers, threads, max_tasks_per_child=1) as pool:
+        futures = {pool.submit(evaluate, ticker, *config, test_mode=test_mode): config for config in grid}
+
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception as ex_:
+                print(f"[ERROR] from sweep: {futures[future]} failed: {ex_}")
+                continue
+            print(f"[INFO] from sweep: {futures[future]} val_mape {results[-1]['val_mape']:.3f} "
+                  f"in {results[-1]['wall_time']:.1f} s")
+
+    results.sort(key=lambda item: (item['time_frame'], item['val_mape']))
+    write_results(results)
+    return results
+
+
+if __name__ == '__main__':
+    sweep_results = run_sweep(current_symbol.replace("USDT", ""))
+
+    for time_frame in sorted({item['time_frame'] for item in sweep_results}):
+        group = [item for item in sweep_results if item['time_frame'] == time_frame]
+        if group:
+            choice = cheapest_best(group)
+            print(f"{time_frame}: struct {choice['model_struct']}, limitation {choice['limitation']}, "
+                  f"epochs {choice['epochs']} (val_mape {choice['val_mape']:.3f}, {choice['wall_time']:.1f} s)")
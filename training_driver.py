@@ -0,0 +1,123 @@
+import os
+import sys
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from source.sample_store import SampleStore
+from source.dataset_builder import DatasetBuilder
+from source.report_log import prediction_log
+from config import SYMBOLS
+
+MODEL_STRUCT = 3
+EPOCHS = 4500
+FINE_TUNE_EPOCHS = 150
+LIMITATION = 30
+
+THREADS_PER_WORKER = 2
+
+
+def limit_threads(threads):
+    # must run before keras is imported, spawned workers inherit the environment of the parent
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["MKL_NUM_THREADS"] = str(threads)
+    os.environ["TF_NUM_INTRAOP_THREADS"] = str(threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = "1"
+
+
+def create_pool(workers=None, threads=THREADS_PER_WORKER, max_tasks_per_child=None):
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 1) // threads)
+
+    # set in the parent as well, so workers get the limits before anything in them can import keras
+    limit_threads(threads)
+
+    options = {}
+    if max_tasks_per_child is not None:
+        if sys.version_info >= (3, 11):
+            options['max_tasks_per_child'] = max_tasks_per_child
+        else:
+            print("[ERROR] from create_pool: max_tasks_per_child needs Python 3.11+, workers will be reused")
+
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=limit_threads, initargs=(threads,), **options)
+
+
+def train_symbol(symbol, time_frame, test_mode=False, model_struct=MODEL_STRUCT, epochs=EPOCHS,
+                 fine_tune_epochs=FINE_TUNE_EPOCHS, limitation=LIMITATION, warm_start=True):
+    from source.neural_network import NeuralNetwork
+
+    time_start = time.perf_counter()
+
+    model = NeuralNetwork(ticker=symbol.replace("USDT", ""), mode="full", model_struct=model_struct,
+                          time_frame=time_frame, limitation_ps=1, limitation_pr=limitation, test_mode=test_mode)
+    model.train(epochs, fine_tune_epochs=fine_tune_epochs, warm_start=warm_start)
+    model.predict()
+    signal, strength = model.get_signal(test_mode=test_mode)
+
+    return {
+        'symbol': symbol,
+        'time_frame': time_frame,
+        'prediction': [float(value) for value in model.prediction],
+        'signal': signal,
+        'strength': strength,
+        'epochs': model.epochs_used,
+        'limitation': limitation,
+        'seconds': time.perf_counter() - time_start
+    }
+
+
+def write_batch_report(results):
+    log = prediction_log()
+    for item in results:
+        # one name too long for the log layout must not cost the rest of the batch
+        try:
+            log.append(symbol=item['symbol'], time_frame=item['time_frame'],
+                       prediction=np.round(item['prediction'][0], 4), strength=item['strength'],
+                       epochs=item['epochs'], limitation=item['limitation'])
+        except ValueError as ex_:
+            print(f"[ERROR] from training_driver: {item['symbol']} {item['time_frame']} not reported: {ex_}")
+
+
+def train_all(symbols=SYMBOLS, time_frames=None, test_mode=False, workers=None,
+              threads=THREADS_PER_WORKER, **train_kwargs):
+    # build the shared store and every dataset once so the workers only load the caches
+    store = SampleStore(test_mode=test_mode)
+    builder = DatasetBuilder(test_mode=test_mode, store=store)
+    tickers = store.tickers()
+
+    results = []
+    with create_pool(workers, threads) as pool:
+        futures = {}
+        for symbol in symbols:
+            if symbol.replace("USDT", "") not in tickers:
+                print(f"[INFO] from training_driver: no samples for {symbol}, skipped")
+                continue
+            ticker_time_frames = builder.build(symbol.replace("USDT", "")).time_frames
+            for time_frame in (time_frames if time_frames is not None else ticker_time_frames):
+                future = pool.submit(train_symbol, symbol, time_frame, test_mode=test_mode, **train_kwargs)
+                futures[future] = (symbol, time_frame)
+
+        for future in as_completed(futures):
+            symbol, time_frame = futures[future]
+            try:
+                results.append(future.result())
+            except Exception as ex_:
+                print(f"[ERROR] from training_driver: {symbol} {time_frame} failed: {ex_}")
+                continue
+            print(f"[INFO] from training_driver: {symbol} {time_frame} done in {results[-1]['seconds']:.1f} s")
+
+    results.sort(key=lambda item: (item['symbol'], item['time_frame']))
+    write_batch_report(results)
+    return results
+
+
+if __name__ == '__main__':
+    time_start = time.perf_counter()
+
+    for result in train_all(test_mode=False):
+        print(f"{result['symbol']} {result['time_frame']}: {result['prediction'][0] * 100:.2f} % "
+              f"{result['signal']} ({result['strength']})")
+
+    print(f"execution time: {time.perf_counter() - time_start:.1f} (s)")